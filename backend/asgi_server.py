@@ -0,0 +1,199 @@
+"""
+Smart Queue Monitoring System - Asyncio Server
+Serves the same API as server.py on python-socketio's AsyncServer under ASGI:
+dashboard connections and MJPEG streams live on one event loop instead of a
+thread each, the Flask REST routes run through a WSGI adapter on a thread
+pool, and the CPU-bound camera monitors keep their own threads and executors.
+
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+
+Run a single worker process: cameras and their state live in the process
+"""
+
+import asyncio
+import inspect
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+os.environ.setdefault('SERVER_MODE', 'asgi')
+
+import socketio
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+import server
+from streaming import MJPEG_BOUNDARY, mjpeg_part
+
+# Socket events that may block (opening a camera, writing zones) run here,
+# never on the event loop
+EVENT_WORKERS = int(os.environ.get('SOCKET_EVENT_WORKERS', 4))
+
+# Flask requests run concurrently, one pool thread each
+HTTP_WORKERS = int(os.environ.get('HTTP_WORKERS', 16))
+
+STREAM_PATH = re.compile(r'^/api/stream/([^/]+)\.mjpg$')
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+event_pool = ThreadPoolExecutor(max_workers=EVENT_WORKERS, thread_name_prefix='socket-event')
+http_pool = ThreadPoolExecutor(max_workers=HTTP_WORKERS, thread_name_prefix='http')
+
+
+class PooledWsgiInstance(WsgiToAsgiInstance):
+    """One WSGI request, run on the HTTP pool"""
+
+    # asgiref runs every request on a single shared thread (thread_sensitive)
+    run_wsgi_app = sync_to_async(inspect.unwrap(WsgiToAsgiInstance.__dict__['run_wsgi_app']),
+                                 thread_sensitive=False, executor=http_pool)
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi whose requests do not wait for each other"""
+
+    async def __call__(self, scope, receive, send):
+        await PooledWsgiInstance(self.wsgi_application)(scope, receive, send)
+
+
+flask_app = PooledWsgiToAsgi(server.app)
+
+
+async def stream_mjpeg(slot, max_fps, receive, send):
+    """Send a slot's frames as multipart JPEG until the camera stops or the client leaves"""
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+    disconnected = asyncio.Event()
+    min_interval = 1.0 / max_fps if max_fps else 0.0
+
+    def wake():
+        # Called from the encoder thread on every publish and on close
+        try:
+            loop.call_soon_threadsafe(changed.set)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+        changed.set()
+
+    headers = [(b'content-type', f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}'.encode()),
+               (b'access-control-allow-origin', b'*')]
+    headers += [(name.lower().encode(), value.encode()) for name, value in server.STREAM_HEADERS.items()]
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+
+    slot.subscribe()
+    slot.listen(wake)
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        last_sequence = -1
+        last_sent = 0.0
+        while not disconnected.is_set():
+            changed.clear()
+            sequence, jpeg, closed = slot.latest()
+            if closed:
+                break
+            if jpeg is None or sequence == last_sequence:
+                await changed.wait()
+                continue
+
+            last_sequence = sequence
+            await send({'type': 'http.response.body', 'body': mjpeg_part(jpeg), 'more_body': True})
+
+            # Per-client rate cap; frames published meanwhile are skipped
+            if min_interval:
+                delay = min_interval - (loop.time() - last_sent)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                last_sent = loop.time()
+        if not disconnected.is_set():
+            await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass  # client went away mid-send
+    finally:
+        watcher.cancel()
+        slot.unlisten(wake)
+        slot.unsubscribe()
+
+
+async def http_app(scope, receive, send):
+    """MJPEG streams on the event loop; everything else (and stream errors) through Flask"""
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        match = STREAM_PATH.match(scope['path'])
+        if match:
+            query = parse_qs(scope['query_string'].decode('latin1'))
+            slot, error, status = server.stream_slot(match.group(1), query.get('tier', ['full'])[0])
+            if slot is not None:
+                try:
+                    max_fps = float(query['fps'][0]) if query.get('fps') else None
+                except ValueError:
+                    max_fps = None
+                await stream_mjpeg(slot, max_fps, receive, send)
+                return
+    await flask_app(scope, receive, send)
+
+
+class AsyncEmitter:
+    """socketio.emit-style calls from any thread, scheduled on the event loop"""
+
+    def __init__(self, sio):
+        self.sio = sio
+        self.loop = None
+
+    def emit(self, event, data=None, to=None, callback=None, **kwargs):
+        if self.loop is None or self.loop.is_closed():
+            return
+        # Fire and forget: the caller (the outbound dispatcher or a handler)
+        # never waits for the network
+        asyncio.run_coroutine_threadsafe(self.sio.emit(event, data, to=to, callback=callback), self.loop)
+
+    def reply_to(self, sid):
+        return lambda event, data=None: self.emit(event, data, to=sid)
+
+
+emitter = AsyncEmitter(sio)
+server.init_monitoring(emitter)
+
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    server.on_connect(sid, emitter.reply_to(sid))
+
+
+@sio.event
+async def disconnect(sid, *args):
+    server.on_disconnect(sid)
+
+
+def async_socket_handler(handler):
+    """Run a shared event handler in the event pool"""
+    async def handle(sid, data=None):
+        await asyncio.get_running_loop().run_in_executor(event_pool, handler, sid, data, emitter.reply_to(sid))
+    return handle
+
+
+for event, handler in server.SOCKET_EVENTS.items():
+    sio.on(event, async_socket_handler(handler))
+
+
+async def startup():
+    emitter.loop = asyncio.get_running_loop()
+    print(f'🚀 Asyncio server ready ({server.SERVER_MODE})')
+
+
+async def shutdown():
+    if server.MONITOR_AVAILABLE:
+        server.manager.stop_all()
+    event_pool.shutdown(wait=False)
+    http_pool.shutdown(wait=False)
+
+
+app = socketio.ASGIApp(sio, other_asgi_app=http_app,
+                       on_startup=startup, on_shutdown=shutdown)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print(f'🚀 Starting asyncio server on port {server.PORT}')
+    uvicorn.run(app, host='0.0.0.0', port=server.PORT, log_level='warning')
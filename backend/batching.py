@@ -0,0 +1,235 @@
+"""
+Shared Batched Detector
+One detector backend shared by every camera; frames submitted by the camera
+pipelines are grouped into micro-batches that are flushed when they are
+full or when the oldest frame has waited for the latency budget. The model
+is loaded and warmed up once, optionally in the background at startup
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from detector_backends import create_backend
+
+
+class DetectionRequest:
+    """A frame waiting for detection and the slot its result is delivered to"""
+
+    __slots__ = ('frame', 'group', 'native', 'submitted', 'done', 'result', 'error')
+
+    def __init__(self, frame, group=None, native=False):
+        self.frame = frame
+        self.group = group  # requests submitted together by one camera
+        self.native = native  # a crop run at its own size instead of imgsz
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchedDetector:
+    """Thread-safe front end that batches detect() calls from many cameras"""
+
+    def __init__(self, model_path='yolov8n.pt', conf=0.45, classes=(0,),
+                 max_batch_size=8, max_latency=0.040, stats_window=200,
+                 backend='ultralytics', int8=False, imgsz=640, threads=None):
+        self.model_path = model_path
+        self.conf = conf
+        self.classes = list(classes)
+        self.backend = create_backend(backend, model_path=model_path, conf=conf, classes=self.classes,
+                                      int8=int8, imgsz=imgsz, threads=threads)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_latency = max(0.0, float(max_latency))
+        self.model = None
+        self.state = 'idle'  # idle, loading, warming_up, ready or failed
+        self.load_error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.preload_thread = None
+        self.pending = []
+        self.condition = threading.Condition()
+        self.load_lock = threading.Lock()
+        self.worker = None
+        self.sources = 0
+        self.batches = 0
+        self.frames = 0
+        self.full_batches = 0
+        # (batch size, mean queueing delay, max queueing delay, inference time)
+        self.recent = deque(maxlen=stats_window)
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def load(self, warmup=True):
+        """Load (and warm up) the model once and start the batching worker"""
+        with self.load_lock:
+            if self.model is not None:
+                return True
+
+            print(f"📦 Loading {self.backend.name} detector ({self.backend.artifact})...")
+            self.state = 'loading'
+            self.load_error = None
+            started = time.perf_counter()
+            try:
+                model = self.backend.load()
+                self.load_seconds = round(time.perf_counter() - started, 3)
+                if warmup:
+                    self.state = 'warming_up'
+                    self.warm_up(model)
+            except Exception as e:
+                self.state = 'failed'
+                self.load_error = str(e)
+                print(f"❌ Failed to load detector: {e}")
+                return False
+
+            self.model = model
+            self.state = 'ready'
+            print(f"✅ Detector ready (load {self.load_seconds}s, warm-up {self.warmup_seconds}s)")
+            self.worker = threading.Thread(target=self._run, name='detector', daemon=True)
+            self.worker.start()
+            return True
+
+    def warm_up(self, model):
+        """Run a single frame and a full batch so the first camera frames skip one-off setup costs"""
+        started = time.perf_counter()
+        frame = np.full((self.backend.imgsz, self.backend.imgsz, 3), 114, dtype=np.uint8)
+        model.predict([frame])
+        if self.max_batch_size > 1:
+            model.predict([frame] * self.max_batch_size)
+        self.warmup_seconds = round(time.perf_counter() - started, 3)
+
+    def preload(self, warmup=True):
+        """Load and warm up the model on a background thread; detect() waits for it"""
+        if self.preload_thread is None and self.model is None:
+            self.preload_thread = threading.Thread(target=self.load, args=(warmup,),
+                                                   name='detector-preload', daemon=True)
+            self.preload_thread.start()
+        return self.preload_thread
+
+    def attach(self):
+        """Register a camera pipeline that will submit frames"""
+        with self.condition:
+            self.sources += 1
+
+    def detach(self):
+        """Unregister a camera pipeline and flush anything waiting on it"""
+        with self.condition:
+            self.sources = max(0, self.sources - 1)
+            self.condition.notify()
+
+    def detect(self, frame):
+        """Detect people in one frame (a DetectionBatch), blocking until its batch completes"""
+        return self.detect_many([frame])[0]
+
+    def detect_many(self, frames, native=False):
+        """Detect people in several images of one camera (e.g. zone crops), queued together;
+        native images run at their own resolution rather than being scaled to imgsz"""
+        if self.model is None and not self.load():
+            raise RuntimeError('Detector model is not loaded')
+
+        group = object()
+        requests = [DetectionRequest(frame, group, native) for frame in frames]
+        with self.condition:
+            self.pending.extend(requests)
+            self.condition.notify()
+
+        for request in requests:
+            request.done.wait()
+        for request in requests:
+            if request.error is not None:
+                raise request.error
+        return [request.result for request in requests]
+
+    def _take_batch(self):
+        """Wait until the batch is full or the oldest frame hits the latency budget"""
+        with self.condition:
+            while not self.pending:
+                self.condition.wait()
+
+            # Each camera has at most one submission in flight, so a batch
+            # holding one from every attached camera cannot grow any further
+            target = max(1, self.sources)
+            deadline = self.pending[0].submitted + self.max_latency
+            while (len(self.pending) < self.max_batch_size
+                   and len({request.group for request in self.pending}) < target):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+            batch = self.pending[:self.max_batch_size]
+            self.pending = self.pending[self.max_batch_size:]
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            self.run_batch(batch)
+
+    def run_batch(self, batch):
+        """Run one model call for a batch of requests and route the results back"""
+        started = time.perf_counter()
+        delays = [started - request.submitted for request in batch]
+        try:
+            for native in (False, True):
+                requests = [request for request in batch if request.native == native]
+                if not requests:
+                    continue
+                results = self.model.predict([request.frame for request in requests], native=native)
+                for request, result in zip(requests, results):
+                    request.result = result
+        except Exception as e:
+            for request in batch:
+                request.error = e
+        finally:
+            self.batches += 1
+            self.frames += len(batch)
+            if len(batch) >= self.max_batch_size:
+                self.full_batches += 1
+            self.recent.append((len(batch), sum(delays) / len(delays), max(delays),
+                                time.perf_counter() - started))
+            for request in batch:
+                request.done.set()
+
+    def stats(self):
+        """Batch fill rate and queueing delay, used to tune the latency budget"""
+        recent = list(self.recent)
+        summary = {
+            'loaded': self.loaded,
+            'state': self.state,
+            'ready': self.ready,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'error': self.load_error,
+            **self.backend.describe(),
+            'max_batch_size': self.max_batch_size,
+            'max_latency_ms': round(self.max_latency * 1000, 1),
+            'batches': self.batches,
+            'frames': self.frames,
+            'full_batches': self.full_batches,
+            'sources': self.sources,
+            'pending': len(self.pending),
+            'avg_batch_size': 0.0,
+            'fill_rate': 0.0,
+            'avg_queue_delay_ms': 0.0,
+            'max_queue_delay_ms': 0.0,
+            'avg_inference_ms': 0.0
+        }
+        if recent:
+            sizes = [entry[0] for entry in recent]
+            summary['avg_batch_size'] = round(sum(sizes) / len(sizes), 2)
+            summary['fill_rate'] = round(sum(sizes) / (len(sizes) * self.max_batch_size), 3)
+            summary['avg_queue_delay_ms'] = round(
+                sum(entry[0] * entry[1] for entry in recent) / sum(sizes) * 1000, 2)
+            summary['max_queue_delay_ms'] = round(max(entry[2] for entry in recent) * 1000, 2)
+            summary['avg_inference_ms'] = round(
+                sum(entry[3] for entry in recent) / len(recent) * 1000, 2)
+        return summary
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Detector Backend Benchmarks
+Runs the same frames through every available detector backend (ultralytics,
+ONNX Runtime, OpenVINO, FP32 and INT8) and reports frames/sec plus agreement
+with a reference backend (precision / recall / F1 of matched boxes)
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from benchmarks.bench_monitor import (DEFAULT_BASELINE, load_baselines, measure, report,
+                                      save_baseline)
+from benchmarks.fixtures import parse_resolution, synthetic_frames, synthetic_people
+from detector_backends import create_backend
+from scripts.export_detector import load_calibration_frames
+
+DEFAULT_SPECS = ['ultralytics', 'onnxruntime', 'onnxruntime:int8', 'openvino', 'openvino:int8']
+
+
+def parse_spec(spec):
+    """'openvino:int8' -> ('openvino', True)"""
+    name, _, variant = spec.partition(':')
+    return name, variant == 'int8'
+
+
+def load_backends(specs, model, conf, imgsz, threads):
+    backends = {}
+    for spec in specs:
+        name, int8 = parse_spec(spec)
+        try:
+            backends[spec] = create_backend(name, model_path=model, conf=conf, int8=int8,
+                                            imgsz=imgsz, threads=threads).load()
+        except Exception as e:
+            print(f"⚠️ Skipping {spec}: {e}")
+    return backends
+
+
+def box_iou(a, b):
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def agreement(predictions, references, threshold=0.5):
+    """Greedy IoU matching of each frame's boxes against the reference"""
+    matched = predicted = expected = 0
+    count_error = 0
+    for prediction, reference in zip(predictions, references):
+        predicted += len(prediction)
+        expected += len(reference)
+        count_error += abs(len(prediction) - len(reference))
+        if not len(prediction) or not len(reference):
+            continue
+        iou = box_iou(prediction.xyxy, reference.xyxy)
+        while iou.size and iou.max() >= threshold:
+            i, j = np.unravel_index(iou.argmax(), iou.shape)
+            matched += 1
+            iou[i, :] = 0
+            iou[:, j] = 0
+
+    precision = matched / predicted if predicted else 1.0
+    recall = matched / expected if expected else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': round(precision, 4), 'recall': round(recall, 4), 'f1': round(f1, 4),
+            'count_mae': round(count_error / max(len(references), 1), 3)}
+
+
+def run_backend(backend, frames, batch_size, min_time):
+    """Throughput at batch size 1 and batch_size, plus the detections of every frame"""
+    detections = []
+    for start in range(0, len(frames), batch_size):
+        detections.extend(backend.predict(frames[start:start + batch_size]))
+
+    position = [0]
+
+    def batch_of(size):
+        def call():
+            start = position[0] % len(frames)
+            backend.predict(frames[start:start + size])
+            position[0] += size
+        return call
+
+    rates = {'fps_batch1': measure(batch_of(1), min_time)}
+    if batch_size > 1:
+        rates[f'fps_batch{batch_size}'] = measure(batch_of(batch_size), min_time) * batch_size
+    return rates, detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare detector backends for speed and accuracy')
+    parser.add_argument('--backends', nargs='+', default=DEFAULT_SPECS,
+                        help='Backends to compare; append :int8 for the quantized export')
+    parser.add_argument('--reference', default='ultralytics', help='Backend whose boxes count as ground truth')
+    parser.add_argument('--model', default='yolov8n.pt', help='Model weights (exports are found next to it)')
+    parser.add_argument('--frames', nargs='*', default=[], help='Recorded images/videos (default: synthetic frames)')
+    parser.add_argument('--count', type=int, default=100, help='Frames to evaluate')
+    parser.add_argument('--resolution', default='1280x720', help='Size of synthetic frames')
+    parser.add_argument('--conf', type=float, default=0.45, help='Detection confidence threshold')
+    parser.add_argument('--imgsz', type=int, default=640, help='Inference size')
+    parser.add_argument('--threads', type=int, default=None, help='Inference threads (default: runtime default)')
+    parser.add_argument('--batch', type=int, default=4, help='Batch size measured besides 1')
+    parser.add_argument('--min-time', type=float, default=3.0, help='Seconds spent timing each backend')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Slowdown reported as a regression')
+    args = parser.parse_args()
+
+    if args.frames:
+        frames = load_calibration_frames(args.frames, args.count)
+        source = 'recorded'
+    else:
+        width, height = parse_resolution(args.resolution)
+        frames = synthetic_frames(width, height, synthetic_people(10, width, height, args.count))
+        source = f'synthetic-{args.resolution}'
+        print("⚠️ Synthetic frames contain no real people; pass --frames for meaningful accuracy")
+    if not frames:
+        print("❌ No frames to evaluate")
+        return 1
+
+    specs = list(dict.fromkeys([args.reference] + args.backends))
+    backends = load_backends(specs, args.model, args.conf, args.imgsz, args.threads)
+    if not backends:
+        print("❌ No detector backend could be loaded")
+        return 1
+
+    results = {}
+    accuracy = {}
+    outputs = {}
+    for spec, backend in backends.items():
+        print(f"⏱️ {spec} ({backend.artifact})")
+        rates, outputs[spec] = run_backend(backend, frames, args.batch, args.min_time)
+        for name, rate in rates.items():
+            results[f'{spec} {name}'] = (rate, 'frames/s')
+
+    reference = args.reference if args.reference in outputs else next(iter(outputs))
+    print(f"\nAgreement with {reference} on {len(frames)} {source} frames (IoU >= 0.5):")
+    print(f"{'backend':<20}{'precision':>10}{'recall':>10}{'f1':>8}{'count MAE':>11}")
+    for spec, detections in outputs.items():
+        accuracy[spec] = agreement(detections, outputs[reference])
+        a = accuracy[spec]
+        print(f"{spec:<20}{a['precision']:>10.3f}{a['recall']:>10.3f}{a['f1']:>8.3f}{a['count_mae']:>11.3f}")
+
+    key = f"detectors-{os.path.basename(args.model)}-{source}-imgsz{args.imgsz}"
+    baseline = load_baselines(args.baseline).get(key)
+    regressions = report(results, baseline['results'] if baseline else None, args.tolerance)
+
+    if args.save_baseline:
+        config = {'model': args.model, 'frames': source, 'count': len(frames), 'imgsz': args.imgsz,
+                  'batch': args.batch, 'threads': args.threads, 'reference': reference}
+        save_baseline(args.baseline, config, results, {'accuracy': accuracy}, key)
+        print(f"✅ Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"⚠️ Slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Monitor Hot Path Benchmarks
+Times zone lookups, detection post-processing, drawing, encoding and the
+whole staged run loop on synthetic frames with a stub detector, and compares
+the rates against a saved baseline so regressions show up as numbers
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import cv2
+import numpy as np
+
+from benchmarks.fixtures import (FakeSocketIO, StubDetector, SyntheticCamera, parse_resolution,
+                                 synthetic_frames, synthetic_people, synthetic_zones)
+from config_store import ZoneConfigStore
+from motion_gate import MotionGate
+from queue_monitor import QueueMonitor
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Distinct synthetic frames replayed by the fake camera
+FRAME_CYCLE = 30
+
+
+def measure(func, min_time=1.0, warmup=3):
+    """Call func repeatedly for at least min_time seconds; returns calls per second"""
+    for _ in range(warmup):
+        func()
+    calls = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - started
+    return calls / elapsed
+
+
+class BenchMonitor(QueueMonitor):
+    """QueueMonitor reading from a SyntheticCamera instead of cv2.VideoCapture"""
+
+    def __init__(self, camera, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.synthetic_camera = camera
+
+    def start_camera(self, source=None):
+        return self.synthetic_camera
+
+
+def make_monitor(config, zones_path, store, socketio, detector, camera=None):
+    monitor = BenchMonitor(camera, socketio, zones_path, camera_id='bench', detector=detector,
+                           motion_gate=MotionGate(enabled=config['motion_gate']),
+                           transport=config['transport'], config_store=store)
+    monitor.load_model()
+    monitor.load_zones()
+    return monitor
+
+
+def bench_stages(config, monitor, frames, min_time):
+    """Per-call rates of the monitor methods on the hot path"""
+    frame = frames[0]
+    height, width = frame.shape[:2]
+    detections = monitor.process_frame(frame)
+    zone_map = monitor.compile_zones(width, height)
+    centers = [tuple(c) for c in detections.center.tolist()] or [(width // 2, height // 2)]
+    polygons = [zone['polygon'] for zone in monitor.zones]
+    out = np.empty_like(frame)
+
+    def point_in_polygon():
+        for center in centers:
+            for polygon in polygons:
+                monitor.point_in_polygon(center, polygon)
+
+    def get_zone_for_point():
+        for center in centers:
+            monitor.get_zone_for_point(center)
+
+    # Each result is (rate, unit); per-detection work is reported per frame
+    results = {
+        'point_in_polygon': (measure(point_in_polygon, min_time), 'frames/s'),
+        'get_zone_for_point': (measure(get_zone_for_point, min_time), 'frames/s'),
+        'zone_lookup': (measure(lambda: zone_map.lookup(detections.center), min_time), 'frames/s'),
+        'process_frame': (measure(lambda: monitor.process_frame(frame), min_time), 'frames/s'),
+        'calculate_statistics': (measure(lambda: monitor.calculate_statistics(detections), min_time), 'frames/s'),
+        'create_customers_list': (measure(lambda: monitor.create_customers_list(detections), min_time), 'frames/s'),
+        'draw_detections': (measure(lambda: monitor.draw_detections(frame, detections, out), min_time), 'frames/s'),
+        'frame_to_jpeg': (measure(lambda: monitor.frame_to_jpeg(frame), min_time), 'frames/s'),
+        'frame_to_base64': (measure(lambda: monitor.frame_to_base64(frame), min_time), 'frames/s'),
+    }
+    return results
+
+
+def bench_run(config, zones_path, store, people, frames):
+    """End-to-end rate of QueueMonitor.run over a fixed number of camera frames"""
+    socketio = FakeSocketIO()
+    camera = SyntheticCamera(frames, config['run_frames'], config['camera_fps'])
+    detector = StubDetector(people, config['infer_ms'] / 1000)
+    monitor = make_monitor(config, zones_path, store, socketio, detector, camera)
+    monitor.clients = lambda: 1
+    monitor.watchers = lambda: 1
+    # Frames read but neither sent nor dropped yet; bounds an unthrottled
+    # camera so the run measures throughput instead of dropped frames
+    def in_flight():
+        queues = monitor.stage_queues
+        if not queues:
+            return camera.read_count
+        # While any stage has a frame waiting the window counts as full, so
+        # the camera never makes a stage drop one
+        if any(q.qsize() for q in queues.values()):
+            return camera.window
+        return (camera.read_count - socketio.events.get('queue_update', 0)
+                - sum(q.dropped for q in queues.values()))
+    camera.in_flight = in_flight
+
+    thread = threading.Thread(target=monitor.run, name='bench-monitor', daemon=True)
+    started = time.perf_counter()
+    thread.start()
+    thread.join()
+    elapsed = time.perf_counter() - started
+
+    updates = socketio.events.get('queue_update', 0)
+    results = {'run_end_to_end': (updates / elapsed, 'frames/s')}
+    for stage in monitor.stages:
+        count = getattr(stage, 'processed', getattr(stage, 'produced', 0))
+        results[f'run_{stage.name}'] = (count / elapsed, 'frames/s')
+
+    info = {
+        'frames_read': camera.read_count,
+        'updates_sent': updates,
+        'dropped': {name: q['dropped'] for name, q in monitor.metrics.queues(monitor.stage_queues).items()},
+        'stage_avg_ms': {stage: summary['avg_ms'] for stage, summary in
+                         monitor.metrics.summary(monitor.stage_queues)['stages'].items()},
+        'json_bytes_per_update': round(socketio.json_bytes / updates) if updates else 0,
+        'binary_bytes_per_update': round(socketio.binary_bytes / updates) if updates else 0
+    }
+    return results, info
+
+
+def run_benchmarks(config):
+    width, height = parse_resolution(config['resolution'])
+    people = synthetic_people(config['people'], width, height, FRAME_CYCLE, seed=config['seed'])
+    frames = synthetic_frames(width, height, people, seed=config['seed'])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zones_path = os.path.join(tmp, 'zones.json')
+        store = ZoneConfigStore()
+        store.save(zones_path, {'zones': synthetic_zones(config['zones'], width, height)})
+
+        monitor = make_monitor(config, zones_path, store, FakeSocketIO(), StubDetector(people))
+        results = bench_stages(config, monitor, frames, config['min_time'])
+        run_results, info = bench_run(config, zones_path, store, people, frames)
+        results.update(run_results)
+    return results, info
+
+
+def config_key(config):
+    """Baselines are only comparable for the same workload"""
+    return (f"{config['resolution']}-p{config['people']}-z{config['zones']}-{config['transport']}"
+            f"-gate{int(config['motion_gate'])}-infer{config['infer_ms']:g}")
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_baseline(path, config, results, info, key=None):
+    baselines = load_baselines(path)
+    baselines[key or config_key(config)] = {
+        'config': config,
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count(),
+                    'opencv': cv2.__version__, 'numpy': np.__version__},
+        'saved': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': {name: round(rate, 2) for name, (rate, _) in results.items()},
+        'info': info
+    }
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def report(results, baseline, tolerance):
+    """Print the results table; returns the names that regressed past tolerance"""
+    regressions = []
+    width = max([24] + [len(name) + 2 for name in results])
+    print(f"\n{'benchmark':<{width}}{'rate':>14}  {'unit':<10}{'baseline':>12}{'change':>9}")
+    for name, (rate, unit) in results.items():
+        line = f"{name:<{width}}{rate:>14,.1f}  {unit:<10}"
+        base = baseline.get(name) if baseline else None
+        if base:
+            change = rate / base - 1
+            flag = ''
+            if change < -tolerance:
+                regressions.append(name)
+                flag = ' ⚠️'
+            line += f"{base:>12,.1f}{change:>+9.1%}{flag}"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the queue monitor hot path offline')
+    parser.add_argument('--people', type=int, default=10, help='People detected per frame')
+    parser.add_argument('--zones', type=int, default=4, help='Number of zones')
+    parser.add_argument('--resolution', default='1280x720', help='Frame size, WIDTHxHEIGHT')
+    parser.add_argument('--transport', default='binary', choices=['mjpeg', 'binary', 'base64', 'geometry'],
+                        help='Video transport of the end-to-end run (mjpeg has no viewers, so no drawing)')
+    parser.add_argument('--motion-gate', action='store_true', help='Enable the motion gate in the run loop')
+    parser.add_argument('--infer-ms', type=float, default=0.0, help='Simulated detector time per frame')
+    parser.add_argument('--camera-fps', type=float, default=None, help='Throttle the fake camera (default: as fast as possible)')
+    parser.add_argument('--run-frames', type=int, default=300, help='Camera frames fed through the run loop')
+    parser.add_argument('--min-time', type=float, default=1.0, help='Seconds spent timing each stage')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic scene')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Slowdown reported as a regression')
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 when something regressed')
+    args = parser.parse_args()
+
+    config = {
+        'people': args.people,
+        'zones': args.zones,
+        'resolution': args.resolution,
+        'transport': args.transport,
+        'motion_gate': args.motion_gate,
+        'infer_ms': args.infer_ms,
+        'camera_fps': args.camera_fps,
+        'run_frames': args.run_frames,
+        'min_time': args.min_time,
+        'seed': args.seed
+    }
+    cv2.setNumThreads(os.cpu_count() or 1)
+
+    print(f"⏱️ Benchmarking {config_key(config)}")
+    results, info = run_benchmarks(config)
+
+    baseline = load_baselines(args.baseline).get(config_key(config))
+    regressions = report(results, baseline['results'] if baseline else None, args.tolerance)
+    print(f"\nrun: {json.dumps(info)}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, config, results, info)
+        print(f"✅ Baseline saved to {args.baseline}")
+    elif baseline is None:
+        print("ℹ️ No baseline for this configuration (use --save-baseline)")
+
+    if regressions:
+        print(f"⚠️ Slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Benchmark Fixtures
+Deterministic stand-ins for the camera, the YOLO detector and Socket.IO so
+the monitor hot path can be timed offline (no camera, GPU or model download)
+"""
+
+import json
+import time
+
+import cv2
+import numpy as np
+
+from detections import DetectionBatch
+
+
+def parse_resolution(value):
+    """'1280x720' -> (1280, 720)"""
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def synthetic_zones(count, width, height):
+    """`count` side-by-side quadrilateral zones, alternating queue / cash desk"""
+    zones = []
+    column = width / max(count, 1)
+    for i in range(count):
+        left = i * column + column * 0.05
+        right = (i + 1) * column - column * 0.05
+        # Slightly skewed so the polygons are not axis-aligned rectangles
+        zones.append({
+            'name': f'Queue {i + 1}' if i % 2 == 0 else f'Cashdesk {i + 1}',
+            'polygon': [[round(left), round(height * 0.15)],
+                        [round(right), round(height * 0.10)],
+                        [round(right - column * 0.05), round(height * 0.95)],
+                        [round(left + column * 0.05), round(height * 0.90)]]
+        })
+    return zones
+
+
+def synthetic_people(count, width, height, frames, seed=0):
+    """Per-frame (count, 4) xyxy boxes of people walking a seeded random path"""
+    rng = np.random.default_rng(seed)
+    box_w = max(8, width // 20)
+    box_h = max(16, height // 5)
+    position = rng.uniform((0, 0), (width - box_w, height - box_h), size=(count, 2))
+    step = rng.normal(0, max(1.0, width / 400), size=(frames, count, 2))
+
+    boxes = []
+    for i in range(frames):
+        position = np.clip(position + step[i], (0, 0), (width - box_w, height - box_h))
+        boxes.append(np.hstack([position, position + (box_w, box_h)]).astype(np.float32))
+    return boxes
+
+
+def synthetic_frames(width, height, people, seed=0):
+    """Camera-like frames (smooth background, noise, filled boxes for people)"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(40, 200, size=(max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    background = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+
+    frames = []
+    for boxes in people:
+        noise = rng.integers(-8, 9, size=background.shape, dtype=np.int16)
+        frame = np.clip(background.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        for x1, y1, x2, y2 in boxes.astype(np.int32).tolist():
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (60, 40, 120), -1)
+        frames.append(frame)
+    return frames
+
+
+class StubDetector:
+    """Drop-in for BatchedDetector returning the synthetic people of each frame in turn"""
+
+    def __init__(self, people, latency=0.0):
+        self.people = people
+        self.latency = latency  # simulated model time per frame, in seconds
+        self.model = None
+        self.calls = 0
+
+    def load(self):
+        self.model = self
+        return True
+
+    def attach(self):
+        pass
+
+    def detach(self):
+        pass
+
+    def detect(self, frame):
+        boxes = self.people[self.calls % len(self.people)]
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return DetectionBatch(boxes, np.full(len(boxes), 0.9, dtype=np.float32))
+
+    def stats(self):
+        return {'loaded': True, 'frames': self.calls}
+
+
+class SyntheticCamera:
+    """cv2.VideoCapture stand-in replaying pre-rendered frames"""
+
+    def __init__(self, frames, limit, fps=None, in_flight=None, window=3):
+        self.frames = frames
+        self.limit = limit
+        self.interval = 1.0 / fps if fps else 0.0
+        # Unthrottled, keep at most `window` frames inside the pipeline
+        # (in_flight() counts frames read but not yet sent or dropped)
+        self.in_flight = in_flight
+        self.window = window
+        self.read_count = 0
+        self.next_time = time.perf_counter()
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return True
+
+    def wait_in_flight(self, limit):
+        if self.in_flight is not None:
+            while self.in_flight() >= limit:
+                time.sleep(0.0002)
+
+    def read(self):
+        if self.read_count >= self.limit:
+            # Let the last frames through before the pipeline stops
+            self.wait_in_flight(1)
+            return False, None
+        if self.interval:
+            delay = self.next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_time += self.interval
+        else:
+            self.wait_in_flight(self.window)
+        frame = self.frames[self.read_count % len(self.frames)]
+        self.read_count += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class FakeSocketIO:
+    """Socket.IO sink counting events and payload bytes"""
+
+    def __init__(self):
+        self.events = {}
+        self.json_bytes = 0
+        self.binary_bytes = 0
+
+    def emit(self, event, data=None, **kwargs):
+        self.events[event] = self.events.get(event, 0) + 1
+        if isinstance(data, dict):
+            binary = {k: v for k, v in data.items() if isinstance(v, bytes)}
+            self.binary_bytes += sum(len(v) for v in binary.values())
+            self.json_bytes += len(json.dumps({k: v for k, v in data.items() if k not in binary}))
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Dashboard Connection Load Test
+Opens growing numbers of concurrent Socket.IO dashboards against a running
+server (threading or asyncio mode), acknowledges every queue_update like the
+real dashboard and reports per-client update rate and latency, to find how
+many concurrent clients the server sustains. Each step can also hold MJPEG
+viewers open and poll the REST API, to check streams never stall REST calls
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import urllib.request
+
+import aiohttp
+import socketio
+
+
+class Dashboard:
+    """One simulated dashboard connection"""
+
+    def __init__(self, url, connect_timeout):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.updates = 0
+        self.latencies = []
+        self.connected = False
+        self.client.on('queue_update', self.on_update)
+
+    async def on_update(self, data):
+        self.updates += 1
+        if isinstance(data, dict) and data.get('time'):
+            self.latencies.append(time.time() - data['time'])
+        return True  # acknowledge, as the dashboard does
+
+    async def connect(self):
+        try:
+            await self.client.connect(self.url, transports=['websocket'], wait_timeout=self.connect_timeout)
+            self.connected = True
+        except Exception:
+            self.connected = False
+        return self.connected
+
+    def reset(self):
+        self.updates = 0
+        self.latencies = []
+
+    async def close(self):
+        try:
+            await self.client.disconnect()
+        except Exception:
+            pass
+
+
+class Viewer:
+    """One MJPEG stream reader, counting the frames it gets"""
+
+    MARKER = b'--frame\r\n'
+
+    def __init__(self, url, tier):
+        self.url = f'{url}&tier={tier}' if '?' in url else f'{url}?tier={tier}'
+        self.frames = 0
+        self.status = None
+
+    async def run(self, session, stop):
+        tail = b''
+        try:
+            async with session.get(self.url, timeout=aiohttp.ClientTimeout(total=None, sock_connect=10)) as response:
+                self.status = response.status
+                while response.status == 200 and not stop.is_set():
+                    chunk = await response.content.readany()
+                    if not chunk:
+                        break
+                    # Frame markers may straddle chunks
+                    data = tail + chunk
+                    self.frames += data.count(self.MARKER)
+                    tail = data[-(len(self.MARKER) - 1):]
+        except Exception:
+            self.status = self.status or 0
+
+    def reset(self):
+        self.frames = 0
+
+
+async def poll_rest(session, url, paths, rate, stop, latencies, errors):
+    """Request the REST paths in turn, rate times a second, recording latency"""
+    interval = 1.0 / rate
+    index = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            async with session.get(url + paths[index % len(paths)],
+                                   timeout=aiohttp.ClientTimeout(total=10)) as response:
+                await response.read()
+                if response.status >= 500:
+                    errors.append(response.status)
+                else:
+                    latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(type(e).__name__)
+        index += 1
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def server_clients(url):
+    """Outbound totals from /api/status (coalesced / dropped updates)"""
+    try:
+        with urllib.request.urlopen(f'{url}/api/status', timeout=5) as response:
+            return json.load(response).get('clients') or {}
+    except Exception:
+        return {}
+
+
+async def run_step(url, count, duration, connect_concurrency, connect_timeout,
+                   viewers=0, camera='0', tier='full', rest_rate=0.0, rest_paths=()):
+    dashboards = [Dashboard(url, connect_timeout) for _ in range(count)]
+    limit = asyncio.Semaphore(connect_concurrency)
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    stop = asyncio.Event()
+    streams = [Viewer(f'{url}/api/stream/{camera}.mjpg', tier) for _ in range(viewers)]
+    stream_tasks = [asyncio.create_task(viewer.run(session, stop)) for viewer in streams]
+    rest_latencies = []
+    rest_errors = []
+
+    async def connect(dashboard):
+        async with limit:
+            return await dashboard.connect()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(d) for d in dashboards))
+    connect_seconds = time.perf_counter() - started
+    connected = [d for d in dashboards if d.connected]
+
+    # Let delivery settle before measuring
+    await asyncio.sleep(1.0)
+    before = server_clients(url)
+    for dashboard in connected:
+        dashboard.reset()
+    for viewer in streams:
+        viewer.reset()
+    poller = None
+    if rest_rate and rest_paths:
+        poller = asyncio.create_task(poll_rest(session, url, list(rest_paths), rest_rate, stop,
+                                               rest_latencies, rest_errors))
+    await asyncio.sleep(duration)
+    after = server_clients(url)
+
+    rates = [d.updates / duration for d in connected]
+    latencies = [latency for d in connected for latency in d.latencies]
+    stream_rates = [viewer.frames / duration for viewer in streams]
+    stop.set()
+    for task in stream_tasks + ([poller] if poller else []):
+        task.cancel()
+    await asyncio.gather(*stream_tasks, *([poller] if poller else []), return_exceptions=True)
+    await session.close()
+    await asyncio.gather(*(d.close() for d in dashboards))
+    return {
+        'clients': count,
+        'connected': len(connected),
+        'connect_s': round(connect_seconds, 2),
+        'rate_median': round(statistics.median(rates), 2) if rates else 0.0,
+        'rate_min': round(min(rates), 2) if rates else 0.0,
+        'latency_p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'latency_p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'coalesced': after.get('coalesced', 0) - before.get('coalesced', 0),
+        'ack_timeouts': after.get('ack_timeouts', 0) - before.get('ack_timeouts', 0),
+        'viewers': viewers,
+        'streaming': sum(1 for viewer in streams if viewer.status == 200 and viewer.frames),
+        'stream_fps_median': round(statistics.median(stream_rates), 2) if stream_rates else 0.0,
+        'rest_requests': len(rest_latencies) + len(rest_errors),
+        'rest_errors': len(rest_errors),
+        'rest_p95_ms': round(percentile(rest_latencies, 0.95) * 1000, 1)
+    }
+
+
+def supported(result, expected_rate, max_latency_ms):
+    """A step passes when everyone connected and got (nearly) every update in
+    time, every MJPEG viewer got frames and REST calls stayed fast"""
+    return (result['connected'] == result['clients']
+            and result['rate_median'] >= 0.9 * expected_rate
+            and result['latency_p95_ms'] <= max_latency_ms
+            and result['streaming'] == result['viewers']
+            and not result['rest_errors']
+            and result['rest_p95_ms'] <= max_latency_ms)
+
+
+async def main_async(args):
+    control = socketio.AsyncClient(reconnection=False)
+    if args.start_camera is not None:
+        await control.connect(args.url, transports=['websocket'])
+        await control.emit('start_camera', {'camera_id': args.camera, 'source': args.start_camera or None})
+        print(f"📹 Started camera {args.camera}, waiting {args.warmup:g}s for updates...")
+        await asyncio.sleep(args.warmup)
+
+    results = []
+    expected_rate = args.expected_fps
+    try:
+        for count in args.clients:
+            result = await run_step(args.url, count, args.duration, args.connect_concurrency,
+                                    args.connect_timeout, args.viewers, args.camera, args.tier,
+                                    args.rest_rate, args.rest_paths)
+            if expected_rate is None:
+                # The smallest step shows the update rate of an unloaded server
+                expected_rate = result['rate_median']
+            result['ok'] = supported(result, expected_rate, args.max_latency_ms)
+            results.append(result)
+            print(f"{count:>6} clients: {result['connected']:>6} connected in {result['connect_s']:>6.2f}s, "
+                  f"{result['rate_median']:>6.2f} updates/s (min {result['rate_min']:.2f}), "
+                  f"latency p50 {result['latency_p50_ms']:.0f} ms p95 {result['latency_p95_ms']:.0f} ms, "
+                  f"coalesced {result['coalesced']}, ack timeouts {result['ack_timeouts']}, "
+                  f"MJPEG {result['streaming']}/{result['viewers']} at {result['stream_fps_median']:.1f} fps, "
+                  f"REST p95 {result['rest_p95_ms']:.0f} ms ({result['rest_errors']} errors) "
+                  f"{'✅' if result['ok'] else '❌'}")
+    finally:
+        if control.connected:
+            await control.emit('stop_camera', {'camera_id': args.camera})
+            await asyncio.sleep(0.5)
+            await control.disconnect()
+
+    passing = [r['clients'] for r in results if r['ok']]
+    print(f"\nExpected {expected_rate or 0:.2f} updates/s per client; "
+          f"supported concurrent clients: {max(passing) if passing else 0}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'url': args.url, 'expected_rate': expected_rate, 'steps': results}, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent dashboard load test')
+    parser.add_argument('--url', default='http://localhost:5000', help='Server URL')
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 100, 200, 400],
+                        help='Concurrent dashboards per step')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds measured per step')
+    parser.add_argument('--start-camera', nargs='?', const='', default=None,
+                        help='Start a camera first (optionally with this source, e.g. a recorded video '
+                             'listed in cameras.json)')
+    parser.add_argument('--camera', default='0', help='Camera id used with --start-camera')
+    parser.add_argument('--warmup', type=float, default=5.0, help='Seconds to wait after starting the camera')
+    parser.add_argument('--expected-fps', type=float, default=None,
+                        help='Updates/s each client should get (default: what the first step gets)')
+    parser.add_argument('--max-latency-ms', type=float, default=500.0, help='Highest acceptable p95 latency')
+    parser.add_argument('--connect-concurrency', type=int, default=50, help='Connections opened at once')
+    parser.add_argument('--connect-timeout', type=float, default=10.0, help='Seconds to wait for a connection')
+    parser.add_argument('--viewers', type=int, default=5,
+                        help='MJPEG streams of --camera held open during each step (0 to skip)')
+    parser.add_argument('--tier', default='full', help='MJPEG tier the viewers watch')
+    parser.add_argument('--rest-rate', type=float, default=5.0,
+                        help='REST requests per second during each step (0 to skip)')
+    parser.add_argument('--rest-paths', nargs='+', default=['/api/health', '/api/status', '/metrics'],
+                        help='REST paths requested in turn')
+    parser.add_argument('--output', default=None, help='Write the results as JSON')
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
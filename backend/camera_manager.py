@@ -0,0 +1,267 @@
+"""
+Multi-Camera Manager
+Runs one QueueMonitor per camera source, each with its own zones file,
+while every camera shares a single loaded detector
+"""
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import BatchedDetector
+from history import StatsHistory
+from motion_gate import MotionGate
+from outbound import Outbound
+from queue_monitor import QueueMonitor, video_room
+from streaming import FrameEncoder
+
+CAMERA_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def parse_resolution(value, default=None):
+    """'1920x1080' -> (1920, 1080)"""
+    if not value:
+        return default
+    width, height = str(value).lower().split('x')
+    return int(width), int(height)
+
+
+def parse_source(source):
+    """Turn '0' into a device index; keep URLs and file paths as strings"""
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+class CameraManager:
+    def __init__(self, socketio, config_dir, default_zones_path=None,
+                 max_batch_size=8, max_latency=0.040, motion_gate=True, motion_refresh=2.0,
+                 transport='mjpeg', encode_workers=None, history_capacity=86400,
+                 stats_store=None, raw_frame_fps=2.0, detector_config=None,
+                 roi_crops=False, roi_padding=0.1, roi_max_crops=3, capture_size=(640, 480),
+                 tiled=False, tile_size=640, tile_overlap=0.2, max_tiles=8,
+                 client_max_fps=None, client_max_in_flight=4, client_ack_timeout=2.0, outbound=None,
+                 allow_source_override=False):
+        self.socketio = socketio
+        # Monitors emit through per-client queues instead of broadcasting directly
+        self.outbound = outbound or Outbound(socketio, max_rate=client_max_fps, max_in_flight=client_max_in_flight,
+                                             ack_timeout=client_ack_timeout).start()
+        self.config_dir = config_dir
+        self.default_zones_path = default_zones_path or os.path.join(config_dir, 'zones.json')
+        self.cameras_path = os.path.join(config_dir, 'cameras.json')
+        detector_config = detector_config or {}
+        self.detector = BatchedDetector(model_path=detector_config.get('model', 'yolov8n.pt'),
+                                        backend=detector_config.get('backend', 'ultralytics'),
+                                        int8=detector_config.get('int8', False),
+                                        imgsz=detector_config.get('imgsz', 640),
+                                        threads=detector_config.get('threads'),
+                                        max_batch_size=max_batch_size, max_latency=max_latency)
+        self.monitors = {}
+        self.threads = {}
+        self.client_count = 0
+        self.video_watchers = {}  # camera id -> sids watching raw frames (geometry transport)
+        self.motion_gate = motion_gate
+        self.motion_refresh = motion_refresh
+        self.transport = transport
+        self.raw_frame_fps = raw_frame_fps
+        self.roi_crops = roi_crops
+        self.roi_padding = roi_padding
+        self.roi_max_crops = roi_max_crops
+        self.capture_size = capture_size
+        self.tiled = tiled
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.max_tiles = max_tiles
+        self.history_capacity = history_capacity
+        # Client-supplied sources are opened by cv2.VideoCapture (local files,
+        # internal URLs), so only configured ones are accepted unless allowed
+        self.allow_source_override = allow_source_override
+        self.stats_store = stats_store
+        # One JPEG encoder pool shared by every camera
+        self.encode_pool = ThreadPoolExecutor(max_workers=encode_workers or min(8, (os.cpu_count() or 2)),
+                                              thread_name_prefix='encoder')
+        self.lock = threading.Lock()
+        self.camera_config = self.load_camera_config()
+
+    def load_camera_config(self):
+        """Load optional per-camera sources and zones files from cameras.json"""
+        if not os.path.exists(self.cameras_path):
+            return {}
+        try:
+            with open(self.cameras_path, 'r') as f:
+                config = json.load(f)
+            cameras = {str(cam['id']): cam for cam in config.get('cameras', [])}
+            print(f"✅ Loaded {len(cameras)} cameras")
+            return cameras
+        except Exception as e:
+            print(f"❌ Failed to load cameras: {e}")
+            return {}
+
+    def valid_camera_id(self, camera_id):
+        return bool(CAMERA_ID_PATTERN.match(str(camera_id)))
+
+    def known_camera(self, camera_id):
+        """Whether a camera is configured, has been started, or is the default camera 0"""
+        camera_id = str(camera_id)
+        return camera_id == '0' or camera_id in self.camera_config or camera_id in self.monitors
+
+    def zones_path(self, camera_id):
+        """Zones file used by a camera (camera 0 keeps the legacy zones.json)"""
+        camera_id = str(camera_id)
+        # A monitor started with a zones_file override keeps using that file
+        monitor = self.monitors.get(camera_id)
+        if monitor is not None:
+            return monitor.config_path
+        configured = self.camera_config.get(camera_id, {}).get('zones_file')
+        if configured:
+            return os.path.join(self.config_dir, configured)
+        if camera_id == '0':
+            return self.default_zones_path
+        return os.path.join(self.config_dir, f'zones_{camera_id}.json')
+
+    def default_source(self, camera_id):
+        camera_id = str(camera_id)
+        source = self.camera_config.get(camera_id, {}).get('source', camera_id)
+        return parse_source(source)
+
+    def source_allowed(self, camera_id, source):
+        """Whether a start request may open this source"""
+        if self.allow_source_override:
+            return True
+        configured = [self.default_source(camera_id)] + [self.default_source(other) for other in self.camera_config]
+        return parse_source(source) in configured
+
+    def get_monitor(self, camera_id):
+        """Return the monitor for a camera, creating it on first use (only for cameras being started)"""
+        camera_id = str(camera_id)
+        with self.lock:
+            monitor = self.monitors.get(camera_id)
+            if monitor is None:
+                # cameras.json may give a camera its own capture resolution and tiling
+                camera = self.camera_config.get(camera_id, {})
+                tiled = camera.get('tiled', self.tiled)
+                monitor = QueueMonitor(self.outbound, self.zones_path(camera_id),
+                                       camera_id=camera_id,
+                                       source=self.default_source(camera_id),
+                                       detector=self.detector,
+                                       clients=lambda: self.client_count,
+                                       watchers=lambda: len(self.video_watchers.get(camera_id, ())),
+                                       motion_gate=MotionGate(refresh_interval=self.motion_refresh,
+                                                              enabled=self.motion_gate),
+                                       transport=self.transport,
+                                       encoder=FrameEncoder(executor=self.encode_pool),
+                                       history=StatsHistory(self.history_capacity),
+                                       stats_store=self.stats_store,
+                                       raw_frame_fps=self.raw_frame_fps,
+                                       roi_crops=self.roi_crops, roi_padding=self.roi_padding,
+                                       roi_max_crops=self.roi_max_crops,
+                                       capture_size=parse_resolution(camera.get('resolution'), self.capture_size),
+                                       tile_size=self.tile_size if tiled else None,
+                                       tile_overlap=self.tile_overlap, max_tiles=self.max_tiles)
+                self.monitors[camera_id] = monitor
+            return monitor
+
+    def start(self, camera_id, source=None, zones_file=None):
+        """Start monitoring a camera in a background thread"""
+        if not self.valid_camera_id(camera_id):
+            return False, f'Invalid camera id: {camera_id}'
+        if source is not None and not self.source_allowed(camera_id, source):
+            return False, f'Source not allowed: {source} (list it in cameras.json or set ALLOW_SOURCE_OVERRIDE=1)'
+        # Unconfigured ids would each keep a monitor and open the id as a source
+        if not self.known_camera(camera_id) and not self.allow_source_override:
+            return False, f'Unknown camera: {camera_id} (add it to cameras.json)'
+
+        camera_id = str(camera_id)
+        with self.lock:
+            created = camera_id not in self.monitors
+        monitor = self.get_monitor(camera_id)
+        with self.lock:
+            if monitor.running:
+                return False, f'Camera {camera_id} already running'
+            previous = self.threads.get(str(camera_id))
+            if previous is not None and previous.is_alive():
+                # The last run is still releasing its camera
+                return False, f'Camera {camera_id} is still stopping'
+
+            if source is not None:
+                monitor.source = parse_source(source)
+            if zones_file:
+                monitor.config_path = os.path.join(self.config_dir, os.path.basename(zones_file))
+            monitor.running = True
+            thread = threading.Thread(target=self.run_monitor, args=(camera_id, monitor, created),
+                                      name=f'monitor-{camera_id}', daemon=True)
+            self.threads[camera_id] = thread
+            thread.start()
+        return True, f'Camera {camera_id} starting'
+
+    def run_monitor(self, camera_id, monitor, created):
+        """Run a monitor, forgetting a new one whose first run could not start"""
+        if monitor.run() is False and created:
+            with self.lock:
+                if self.monitors.get(camera_id) is monitor and not monitor.running:
+                    del self.monitors[camera_id]
+
+    def stop(self, camera_id):
+        """Stop monitoring a camera"""
+        monitor = self.monitors.get(str(camera_id))
+        if monitor is None or not monitor.running:
+            return False, f'Camera {camera_id} is not running'
+        monitor.stop()
+        return True, f'Camera {camera_id} stopping'
+
+    def client_connected(self, sid=None):
+        with self.lock:
+            self.client_count += 1
+        if sid is not None:
+            self.outbound.connect(sid)
+
+    def client_disconnected(self, sid=None):
+        with self.lock:
+            self.client_count = max(0, self.client_count - 1)
+            for watchers in self.video_watchers.values():
+                watchers.discard(sid)
+        if sid is not None:
+            self.outbound.disconnect(sid)
+
+    def watch_video(self, sid, camera_id, watch=True):
+        """Track which clients want raw frames for client-side overlays"""
+        with self.lock:
+            watchers = self.video_watchers.setdefault(str(camera_id), set())
+            if watch:
+                watchers.add(sid)
+            else:
+                watchers.discard(sid)
+        room = video_room(camera_id)
+        if watch:
+            self.outbound.join(sid, room)
+        else:
+            self.outbound.leave(sid, room)
+
+    def stop_all(self):
+        for camera_id in list(self.monitors):
+            self.stop(camera_id)
+
+    @property
+    def any_running(self):
+        return any(monitor.running for monitor in self.monitors.values())
+
+    def status(self):
+        """Describe every known camera"""
+        camera_ids = set(self.camera_config) | set(self.monitors)
+        cameras = []
+        for camera_id in sorted(camera_ids):
+            monitor = self.monitors.get(camera_id)
+            cameras.append({
+                'camera': camera_id,
+                'source': str(monitor.source if monitor else self.default_source(camera_id)),
+                'zones_file': os.path.basename(self.zones_path(camera_id)),
+                'running': bool(monitor and monitor.running),
+                'frames': monitor.frame_count if monitor else 0,
+                'motion': monitor.motion_gate.stats() if monitor else None,
+                'video': monitor.encoder.stats() if monitor else None,
+                'roi': monitor.zone_crops.describe() if monitor and monitor.zone_crops else None,
+                'metrics': monitor.metrics.summary(monitor.stage_queues) if monitor else None
+            })
+        return cameras
@@ -0,0 +1,123 @@
+"""
+Zone Configuration Store
+In-memory, versioned cache of zones files with ETags, atomic writes and
+change notifications so running monitors pick up new zones between frames
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+class ZoneConfig:
+    """Immutable snapshot of one zones file"""
+
+    __slots__ = ('path', 'config', 'version', 'etag', 'stamp')
+
+    def __init__(self, path, config, version, etag, stamp=None):
+        self.path = path
+        self.config = config
+        self.version = version
+        self.etag = etag
+        self.stamp = stamp
+
+    @property
+    def zones(self):
+        return self.config.get('zones', [])
+
+    @property
+    def exists(self):
+        return self.stamp is not None
+
+
+def file_stamp(path):
+    """Cheap change detector: (mtime_ns, size) or None when missing"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ZoneConfigStore:
+    def __init__(self):
+        self.entries = {}
+        self.listeners = {}
+        self.lock = threading.RLock()
+
+    def key(self, path):
+        return os.path.abspath(path)
+
+    def get(self, path):
+        """Cached snapshot of a zones file, re-read only if it changed on disk"""
+        key = self.key(path)
+        stamp = file_stamp(key)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.stamp == stamp:
+                return entry
+
+            if stamp is None:
+                data = b'{"zones": []}'
+            else:
+                with open(key, 'rb') as f:
+                    data = f.read()
+            entry = ZoneConfig(key, json.loads(data),
+                               (entry.version + 1) if entry else 1,
+                               hashlib.sha1(data).hexdigest(), stamp)
+            self.entries[key] = entry
+
+        if stamp is not None:
+            self.notify(entry)
+        return entry
+
+    def save(self, path, config):
+        """Atomically write a zones file and push it to subscribed monitors"""
+        if not isinstance(config.get('zones'), list):
+            raise ValueError("Zone configuration needs a 'zones' list")
+
+        key = self.key(path)
+        data = json.dumps(config, indent=2).encode('utf-8')
+        with self.lock:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(key), prefix='.zones-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, key)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            previous = self.entries.get(key)
+            entry = ZoneConfig(key, json.loads(data), (previous.version + 1) if previous else 1,
+                               hashlib.sha1(data).hexdigest(), file_stamp(key))
+            self.entries[key] = entry
+
+        self.notify(entry)
+        return entry
+
+    def subscribe(self, path, callback):
+        """Call callback(snapshot) whenever the zones file changes"""
+        with self.lock:
+            self.listeners.setdefault(self.key(path), []).append(callback)
+
+    def unsubscribe(self, path, callback):
+        with self.lock:
+            callbacks = self.listeners.get(self.key(path), [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def notify(self, entry):
+        with self.lock:
+            callbacks = list(self.listeners.get(entry.path, []))
+        for callback in callbacks:
+            callback(entry)
+
+
+# Shared by the server, the camera manager and standalone monitors
+zone_configs = ZoneConfigStore()
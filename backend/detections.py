@@ -0,0 +1,119 @@
+"""
+Detection Batch
+Struct-of-arrays container for the people detected in one frame; boxes,
+confidences, centers and zone ids live in contiguous NumPy arrays and are
+only turned into dicts at the JSON boundary
+"""
+
+import numpy as np
+
+
+class DetectionBatch:
+    """Detections of one frame as parallel NumPy arrays"""
+
+    __slots__ = ('xyxy', 'conf', 'center', 'zone_id', 'zone_names')
+
+    def __init__(self, xyxy, conf, zone_id=None, zone_names=None):
+        self.xyxy = np.ascontiguousarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.ascontiguousarray(conf, dtype=np.float32).reshape(-1)
+        self.center = ((self.xyxy[:, :2] + self.xyxy[:, 2:]) / 2).astype(np.int32)
+        if zone_id is None:
+            zone_id = np.zeros(len(self.xyxy), dtype=np.uint8)
+        self.zone_id = np.asarray(zone_id)
+        self.zone_names = zone_names or ['Unknown']
+
+    @classmethod
+    def empty(cls, zone_names=None):
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), zone_names=zone_names)
+
+    @classmethod
+    def from_result(cls, result):
+        """Pull boxes and confidences off a YOLO result with one transfer each"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty()
+        return cls(boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy())
+
+    @classmethod
+    def concatenate(cls, batches, offsets=None):
+        """Join per-crop detections, shifting each by its crop's (x, y) origin"""
+        if not batches:
+            return cls.empty()
+        xyxy = [batch.xyxy for batch in batches]
+        if offsets is not None:
+            xyxy = [boxes + np.float32((x, y, x, y)) for boxes, (x, y) in zip(xyxy, offsets)]
+        return cls(np.concatenate(xyxy), np.concatenate([batch.conf for batch in batches]))
+
+    @classmethod
+    def from_tiles(cls, batches, tiles, width, height, iou=0.5, ios=0.6):
+        """Join detections of overlapping tiles with cross-tile NMS
+
+        Duplicates from neighbouring tiles are suppressed by IoU; a box cut
+        off at an inner tile edge is merged (box union) into any detection
+        covering most of it, so a person on a seam counts once
+        """
+        joined = cls.concatenate(batches, [tile[:2] for tile in tiles])
+        if len(joined) < 2:
+            return joined
+
+        xyxy = joined.xyxy.copy()
+        cut = np.zeros(len(xyxy), dtype=bool)
+        start = 0
+        for batch, (x1, y1, x2, y2) in zip(batches, tiles):
+            boxes = xyxy[start:start + len(batch)]
+            cut[start:start + len(batch)] = (((boxes[:, 0] <= x1 + 2) & (x1 > 0)) |
+                                             ((boxes[:, 1] <= y1 + 2) & (y1 > 0)) |
+                                             ((boxes[:, 2] >= x2 - 2) & (x2 < width)) |
+                                             ((boxes[:, 3] >= y2 - 2) & (y2 < height)))
+            start += len(batch)
+
+        areas = np.prod(xyxy[:, 2:] - xyxy[:, :2], axis=1)
+        alive = np.ones(len(xyxy), dtype=bool)
+        keep = []
+        for i in np.argsort(-joined.conf, kind='stable').tolist():
+            if not alive[i]:
+                continue
+            alive[i] = False
+            keep.append(i)
+            rest = np.flatnonzero(alive)
+            if not len(rest):
+                break
+            top_left = np.maximum(xyxy[i, :2], xyxy[rest, :2])
+            bottom_right = np.minimum(xyxy[i, 2:], xyxy[rest, 2:])
+            inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+            overlap = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+            covered = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+            seam = (cut[i] | cut[rest]) & (covered > ios)
+            duplicate = (overlap > iou) | seam
+            if seam.any():
+                pieces = xyxy[rest[seam]]
+                xyxy[i, :2] = np.minimum(xyxy[i, :2], pieces[:, :2].min(axis=0))
+                xyxy[i, 2:] = np.maximum(xyxy[i, 2:], pieces[:, 2:].max(axis=0))
+            alive[rest[duplicate]] = False
+        return cls(xyxy[keep], joined.conf[keep])
+
+    def __len__(self):
+        return len(self.conf)
+
+    def assign_zones(self, zone_map):
+        """Look up the zone of every center in one raster index"""
+        self.zone_id = zone_map.lookup(self.center)
+        self.zone_names = zone_map.names
+        return self
+
+    def zone_counts(self):
+        """Number of detections per zone id (index 0 = Unknown)"""
+        return np.bincount(self.zone_id, minlength=len(self.zone_names))
+
+    def zones(self):
+        """Zone name of every detection"""
+        return [self.zone_names[zone_id] for zone_id in self.zone_id.tolist()]
+
+    def to_geometry(self):
+        """Compact payload for clients that draw the overlay themselves"""
+        return {
+            'boxes': self.xyxy.astype(np.int32).reshape(-1).tolist(),  # x1, y1, x2, y2 per detection
+            'zones': self.zone_id.tolist(),  # index into zoneNames (0 = Unknown)
+            'zoneNames': list(self.zone_names),
+            'tracks': None  # no tracker yet
+        }
@@ -0,0 +1,279 @@
+"""
+Detector Backends
+Interchangeable person detectors behind BatchedDetector: the ultralytics
+(PyTorch) model, or YOLO exports run directly on ONNX Runtime or OpenVINO
+for CPU-only boxes, each optionally INT8-quantized. Every backend returns
+one DetectionBatch per frame
+"""
+
+import json
+import os
+
+import cv2
+import numpy as np
+
+from detections import DetectionBatch
+
+BACKEND_NAMES = ('ultralytics', 'onnxruntime', 'openvino')
+
+# Input sizes must be multiples of the model's largest stride
+STRIDE = 32
+
+DEFAULT_CONFIG = {
+    'backend': 'ultralytics',
+    'model': 'yolov8n.pt',
+    'int8': False,
+    'imgsz': 640,
+    'threads': None
+}
+
+
+def load_detector_config(path, overrides=None):
+    """Detector settings from an optional JSON file, then non-empty overrides"""
+    config = dict(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                config.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring {path}: {e}")
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            config[key] = value
+    if config['backend'] not in BACKEND_NAMES:
+        raise ValueError(f"Unknown detector backend: {config['backend']}")
+    return config
+
+
+def model_artifact(model_path, backend, int8=False):
+    """File (or directory) a backend loads for a model; explicit exports are used as given"""
+    if model_path.endswith(('.onnx', '.xml')) or os.path.isdir(model_path):
+        return model_path
+
+    stem = os.path.splitext(model_path)[0]
+    name = os.path.basename(stem)
+    if backend == 'onnxruntime':
+        return f'{stem}.int8.onnx' if int8 else f'{stem}.onnx'
+    if backend == 'openvino':
+        folder = f'{stem}_int8_openvino_model' if int8 else f'{stem}_openvino_model'
+        return os.path.join(folder, f'{name}.xml')
+    # ultralytics runs its own INT8 OpenVINO export through the YOLO wrapper
+    return f'{stem}_int8_openvino_model' if int8 else model_path
+
+
+def input_shape(frame, size, stride=STRIDE):
+    """Stride-aligned (height, width) input for a frame run at native resolution,
+    downscaled only when its longer side exceeds size"""
+    height, width = frame.shape[:2]
+    ratio = min(1.0, size / max(height, width))
+    return (int(np.ceil(height * ratio / stride)) * stride,
+            int(np.ceil(width * ratio / stride)) * stride)
+
+
+def letterbox(frame, size, scaleup=True):
+    """Resize keeping aspect ratio and pad to size x size, or (height, width) (ultralytics LetterBox)"""
+    height, width = frame.shape[:2]
+    out_h, out_w = (size, size) if isinstance(size, int) else size
+    ratio = min(out_h / height, out_w / width)
+    if not scaleup:
+        ratio = min(ratio, 1.0)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    pad_w, pad_h = (out_w - new_w) / 2, (out_h - new_h) / 2
+
+    if (new_w, new_h) != (width, height):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return frame, ratio, (left, top)
+
+
+def preprocess(frames, size, scaleup=True):
+    """BGR frames -> NCHW float32 RGB tensor in [0, 1] plus letterbox parameters"""
+    out_h, out_w = (size, size) if isinstance(size, int) else size
+    batch = np.empty((len(frames), 3, out_h, out_w), dtype=np.float32)
+    meta = []
+    for i, frame in enumerate(frames):
+        image, ratio, pad = letterbox(frame, size, scaleup)
+        # BGR HWC -> RGB CHW, scaled in one pass
+        np.multiply(image[:, :, ::-1].transpose(2, 0, 1), 1 / 255.0, out=batch[i], casting='unsafe')
+        meta.append((ratio, pad, frame.shape[:2]))
+    return batch, meta
+
+
+def shape_groups(frames, size):
+    """Indices of frames sharing a native input shape, keyed by that shape"""
+    groups = {}
+    for i, frame in enumerate(frames):
+        groups.setdefault(input_shape(frame, size), []).append(i)
+    return groups
+
+
+def postprocess(output, meta, conf=0.45, classes=None, iou=0.45, max_det=300):
+    """Raw YOLOv8 output (N, 4 + classes, anchors) -> one DetectionBatch per frame"""
+    results = []
+    for prediction, (ratio, (pad_x, pad_y), (height, width)) in zip(output, meta):
+        prediction = prediction.T  # anchors x (cx, cy, w, h, class scores...)
+        scores = prediction[:, 4:]
+        class_ids = np.asarray(classes) if classes else np.arange(scores.shape[1])
+        scores = scores[:, class_ids]
+        best = scores.argmax(axis=1)
+        confidence = scores[np.arange(len(scores)), best]
+        keep = confidence >= conf
+        if not keep.any():
+            results.append(DetectionBatch.empty())
+            continue
+
+        boxes = prediction[keep, :4]
+        confidence = confidence[keep]
+        best = best[keep]
+        xywh = np.column_stack([boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2,
+                                boxes[:, 2], boxes[:, 3]])
+        # Offset boxes per class so NMS never suppresses across classes
+        offset = (best * 4096.0)[:, None]
+        nms_boxes = xywh.copy()
+        nms_boxes[:, :2] += offset
+        indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confidence.tolist(), conf, iou)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:max_det]
+
+        xyxy = np.column_stack([xywh[indices, :2], xywh[indices, :2] + xywh[indices, 2:]])
+        xyxy -= (pad_x, pad_y, pad_x, pad_y)
+        xyxy /= ratio
+        np.clip(xyxy, 0, (width, height, width, height), out=xyxy)
+        results.append(DetectionBatch(xyxy, confidence[indices]))
+    return results
+
+
+class DetectorBackend:
+    """Loads a model and turns lists of BGR frames into DetectionBatches"""
+
+    name = None
+
+    def __init__(self, model_path='yolov8n.pt', conf=0.45, classes=(0,), int8=False, imgsz=640,
+                 threads=None):
+        self.model_path = model_path
+        self.conf = conf
+        self.classes = list(classes) if classes is not None else None
+        self.int8 = int8
+        self.imgsz = int(imgsz)
+        self.threads = threads
+        self.artifact = model_artifact(model_path, self.name, int8)
+        self.batched = True  # whether one call can take several frames
+        self.dynamic = True  # whether inputs can have any stride-aligned size
+
+    def load(self):
+        raise NotImplementedError
+
+    def infer(self, batch):
+        """Raw model output for an NCHW batch"""
+        raise NotImplementedError
+
+    def predict(self, frames, native=False):
+        """Detections per frame; native frames (zone crops, tiles) are never upscaled"""
+        if not native:
+            return self.run(frames, self.imgsz)
+        if not self.dynamic:
+            # Fixed-size exports take imgsz x imgsz; the crop is padded, not enlarged
+            return self.run(frames, self.imgsz, scaleup=False)
+        # Each crop runs at its own stride-aligned size, so the work follows its area
+        results = [None] * len(frames)
+        for shape, indices in shape_groups(frames, self.imgsz).items():
+            for i, result in zip(indices, self.run([frames[i] for i in indices], shape, scaleup=False)):
+                results[i] = result
+        return results
+
+    def run(self, frames, size, scaleup=True):
+        batch, meta = preprocess(frames, size, scaleup)
+        if self.batched:
+            output = self.infer(batch)
+        else:
+            output = np.concatenate([self.infer(batch[i:i + 1]) for i in range(len(batch))])
+        return postprocess(output, meta, self.conf, self.classes)
+
+    def describe(self):
+        return {'backend': self.name, 'model': self.artifact, 'int8': self.int8, 'imgsz': self.imgsz}
+
+
+class UltralyticsBackend(DetectorBackend):
+    name = 'ultralytics'
+
+    def load(self):
+        from ultralytics import YOLO
+
+        self.model = YOLO(self.artifact)
+        return self
+
+    def predict(self, frames, native=False):
+        if not native:
+            return self.run(frames, self.imgsz)
+        # ultralytics upscales to imgsz, so it gets each crop's own stride-aligned size
+        results = [None] * len(frames)
+        for shape, indices in shape_groups(frames, self.imgsz).items():
+            for i, result in zip(indices, self.run([frames[i] for i in indices], list(shape))):
+                results[i] = result
+        return results
+
+    def run(self, frames, size):
+        results = self.model(frames, conf=self.conf, classes=self.classes, imgsz=size, verbose=False)
+        return [DetectionBatch.from_result(result) for result in results]
+
+
+class OnnxRuntimeBackend(DetectorBackend):
+    name = 'onnxruntime'
+
+    def load(self):
+        import onnxruntime as ort
+
+        if not os.path.exists(self.artifact):
+            raise FileNotFoundError(f'{self.artifact} not found (run scripts/export_detector.py)')
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = int(self.threads)
+        self.session = ort.InferenceSession(self.artifact, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.batched = not isinstance(model_input.shape[0], int)
+        self.dynamic = not isinstance(model_input.shape[2], int)
+        if not self.dynamic:
+            self.imgsz = model_input.shape[2]
+        return self
+
+    def infer(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVINOBackend(DetectorBackend):
+    name = 'openvino'
+
+    def load(self):
+        import openvino as ov
+
+        if not os.path.exists(self.artifact):
+            raise FileNotFoundError(f'{self.artifact} not found (run scripts/export_detector.py)')
+        core = ov.Core()
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if self.threads:
+            config['INFERENCE_NUM_THREADS'] = int(self.threads)
+        self.compiled = core.compile_model(core.read_model(self.artifact), 'CPU', config)
+        shape = self.compiled.input(0).get_partial_shape()
+        self.batched = shape[0].is_dynamic
+        self.dynamic = shape[2].is_dynamic
+        return self
+
+    def infer(self, batch):
+        return self.compiled(batch)[0]
+
+
+BACKENDS = {
+    'ultralytics': UltralyticsBackend,
+    'onnxruntime': OnnxRuntimeBackend,
+    'openvino': OpenVINOBackend
+}
+
+
+def create_backend(backend='ultralytics', **options):
+    """Instantiate (without loading) a detector backend by name"""
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown detector backend: {backend}')
+    return BACKENDS[backend](**options)
@@ -0,0 +1,136 @@
+"""
+Statistics History
+Fixed-size NumPy ring buffer of the statistics of one camera, aggregated per
+fixed interval (one row per second by default, whatever the frame rate), and
+queried as constant-size min/max/avg bucketed series
+"""
+
+import math
+import threading
+
+import numpy as np
+
+# Numeric fields of calculate_statistics() kept in the history
+HISTORY_FIELDS = ('totalPeople', 'inQueue', 'atCashdesk', 'completed',
+                  'avgWaitTime', 'maxWaitTime', 'alerts')
+
+
+class StatsHistory:
+    """Ring buffer of per-interval (frames, sum, min, max) rows with bucketed range queries"""
+
+    def __init__(self, capacity=86400, fields=HISTORY_FIELDS, interval=1.0):
+        self.capacity = int(capacity)
+        self.fields = tuple(fields)
+        self.interval = interval or None  # seconds per row (None: one row per frame)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.counts = np.zeros(self.capacity, dtype=np.int32)
+        # One contiguous row per field so bucket reductions stream through memory
+        self.sums = np.zeros((len(self.fields), self.capacity), dtype=np.float32)
+        self.minimum = np.zeros((len(self.fields), self.capacity), dtype=np.float32)
+        self.maximum = np.zeros((len(self.fields), self.capacity), dtype=np.float32)
+        self.head = 0  # next row to write
+        self.size = 0
+        self.pending = None  # [interval start, frames, sum, min, max] of the current interval
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size + (1 if self.pending is not None else 0)
+
+    @property
+    def seconds(self):
+        """Time span the buffer holds when full (None without an interval)"""
+        return self.capacity * self.interval if self.interval else None
+
+    def append(self, timestamp, stats):
+        """Fold one frame's statistics into the current interval's row"""
+        row = np.array([stats.get(field, 0) for field in self.fields], dtype=np.float32)
+        start = math.floor(timestamp / self.interval) * self.interval if self.interval else timestamp
+        with self.lock:
+            pending = self.pending
+            if pending is not None and pending[0] == start:
+                pending[1] += 1
+                pending[2] += row
+                np.minimum(pending[3], row, out=pending[3])
+                np.maximum(pending[4], row, out=pending[4])
+                return
+            if pending is not None:
+                self.write(*pending)
+            self.pending = [start, 1, row.copy(), row.copy(), row.copy()]
+
+    def write(self, timestamp, count, total, low, high):
+        """Store a finished row, overwriting the oldest one when full"""
+        self.timestamps[self.head] = timestamp
+        self.counts[self.head] = count
+        self.sums[:, self.head] = total
+        self.minimum[:, self.head] = low
+        self.maximum[:, self.head] = high
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def segments(self):
+        """Chronological (start, end) index ranges of the stored rows"""
+        if self.size < self.capacity:
+            return [(0, self.size)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def window(self, start=None, end=None):
+        """Timestamps, frame counts and (fields x rows) sums/minima/maxima with start <= timestamp <= end"""
+        parts = []
+        with self.lock:
+            for lo, hi in self.segments():
+                ts = self.timestamps[lo:hi]
+                first = lo + (np.searchsorted(ts, start, side='left') if start is not None else 0)
+                last = lo + (np.searchsorted(ts, end, side='right') if end is not None else len(ts))
+                if last > first:
+                    parts.append((self.timestamps[first:last].copy(), self.counts[first:last].copy(),
+                                  self.sums[:, first:last].copy(), self.minimum[:, first:last].copy(),
+                                  self.maximum[:, first:last].copy()))
+            # The interval still being filled is part of the answer too
+            pending = self.pending
+            if pending is not None and (start is None or pending[0] >= start) and (end is None or pending[0] <= end):
+                parts.append((np.array([pending[0]], np.float64), np.array([pending[1]], np.int32),
+                              pending[2][:, None].copy(), pending[3][:, None].copy(), pending[4][:, None].copy()))
+
+        if not parts:
+            empty = np.zeros((len(self.fields), 0), np.float32)
+            return np.zeros(0, np.float64), np.zeros(0, np.int32), empty, empty, empty
+        if len(parts) == 1:
+            return parts[0]
+        timestamps, counts, sums, minimum, maximum = zip(*parts)
+        return (np.concatenate(timestamps), np.concatenate(counts), np.concatenate(sums, axis=1),
+                np.concatenate(minimum, axis=1), np.concatenate(maximum, axis=1))
+
+    def query(self, start=None, end=None, points=300):
+        """Downsample a time range into at most `points` min/max/avg buckets"""
+        timestamps, counts, sums, minimum, maximum = self.window(start, end)
+        points = max(1, int(points))
+
+        if len(timestamps) <= points:
+            bucket_times = timestamps
+        else:
+            # Equal-width time buckets; empty buckets are dropped
+            lo = timestamps[0] if start is None else start
+            hi = timestamps[-1] if end is None else end
+            edges = np.linspace(lo, hi, points + 1)[:-1]
+            starts = np.unique(np.searchsorted(timestamps, edges, side='left'))
+            starts = starts[starts < len(timestamps)]
+
+            bucket_times = timestamps[starts]
+            counts = np.add.reduceat(counts, starts)
+            sums = np.add.reduceat(sums, starts, axis=1)
+            minimum = np.minimum.reduceat(minimum, starts, axis=1)
+            maximum = np.maximum.reduceat(maximum, starts, axis=1)
+        average = sums / np.maximum(counts, 1)
+
+        return {
+            'fields': list(self.fields),
+            'from': float(timestamps[0]) if len(timestamps) else start,
+            'to': float(timestamps[-1]) if len(timestamps) else end,
+            'interval': self.interval,
+            'samples': int(counts.sum()),  # frames
+            'timestamps': np.round(bucket_times, 3).tolist(),
+            'count': counts.tolist(),
+            'min': dict(zip(self.fields, minimum.tolist())),
+            'max': dict(zip(self.fields, maximum.tolist())),
+            'avg': dict(zip(self.fields, np.round(average, 3).tolist()))
+        }
@@ -0,0 +1,197 @@
+"""
+Pipeline Metrics
+Per-stage latency histograms and frame counters kept by every QueueMonitor,
+summarized for /api/status and rendered in the Prometheus text format for
+/metrics (no client library needed)
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.04, 0.08, 0.16, 0.32, 0.64, 1.28, 2.56)
+
+STAGES = ('capture', 'inference', 'detect', 'annotate', 'encode', 'emit')
+FRAME_EVENTS = ('read', 'inferred', 'skipped', 'emitted')
+
+
+class Histogram:
+    """Cumulative bucket counts plus a short window of recent samples"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window=256):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        # One writer per histogram (its stage thread), so no lock is taken
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def time(self, func, *args):
+        """Call func(*args) and record how long it took"""
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def summary(self):
+        """Live latency of the recent samples, in milliseconds"""
+        recent = sorted(self.recent)
+        if not recent:
+            return {'count': self.count, 'avg_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'count': self.count,
+            'avg_ms': round(sum(recent) / len(recent) * 1000, 2),
+            'p50_ms': round(recent[len(recent) // 2] * 1000, 2),
+            'p95_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 2),
+            'max_ms': round(recent[-1] * 1000, 2)
+        }
+
+
+class MonitorMetrics:
+    """Stage timers, frame counters and queue drop totals of one camera"""
+
+    def __init__(self):
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.frames = dict.fromkeys(FRAME_EVENTS, 0)
+        self.dropped = {}  # drops of finished runs, per queue
+        self.emit_times = deque(maxlen=120)
+        self.lock = threading.Lock()
+
+    def count(self, event, n=1):
+        self.frames[event] += n
+        if event == 'emitted':
+            self.emit_times.append(time.monotonic())
+
+    def add_dropped(self, queues):
+        """Carry a finished run's queue drops into the running totals"""
+        with self.lock:
+            for name, q in queues.items():
+                self.dropped[name] = self.dropped.get(name, 0) + q.dropped
+
+    def fps(self):
+        """Emitted frames per second over the recent window"""
+        times = list(self.emit_times)
+        if len(times) < 2 or time.monotonic() - times[-1] > 2.0:
+            return 0.0
+        return round((len(times) - 1) / (times[-1] - times[0]), 2)
+
+    def queues(self, live_queues):
+        """Depth and total drops of every inter-stage queue"""
+        with self.lock:
+            names = set(self.dropped) | set(live_queues)
+            return {name: {
+                'depth': live_queues[name].qsize() if name in live_queues else 0,
+                'dropped': self.dropped.get(name, 0) + (live_queues[name].dropped if name in live_queues else 0)
+            } for name in sorted(names)}
+
+    def summary(self, live_queues):
+        return {
+            'fps': self.fps(),
+            'frames': dict(self.frames),
+            'stages': {stage: histogram.summary() for stage, histogram in self.stages.items()},
+            'queues': self.queues(live_queues)
+        }
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class PrometheusText:
+    """Builder for the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text):
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+
+    def sample(self, name, value, **labels):
+        if labels:
+            label_text = ','.join(f'{key}="{escape(val)}"' for key, val in labels.items())
+            name = f'{name}{{{label_text}}}'
+        self.lines.append(f'{name} {value}')
+
+    def histogram(self, name, histogram, **labels):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            self.sample(f'{name}_bucket', cumulative, **labels, le=f'{bound:g}')
+        self.sample(f'{name}_bucket', histogram.count, **labels, le='+Inf')
+        self.sample(f'{name}_sum', float(histogram.sum), **labels)
+        self.sample(f'{name}_count', histogram.count, **labels)
+
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def render_metrics(manager, stats_store=None):
+    """Prometheus text for every camera, the shared detector and the stats store"""
+    out = PrometheusText()
+    monitors = sorted(manager.monitors.items())
+
+    out.family('queue_camera_running', 'gauge', 'Whether the camera pipeline is running')
+    for camera_id, monitor in monitors:
+        out.sample('queue_camera_running', int(bool(monitor.running)), camera=camera_id)
+
+    out.family('queue_stage_seconds', 'histogram', 'Time spent on one frame in each pipeline stage')
+    for camera_id, monitor in monitors:
+        for stage, histogram in monitor.metrics.stages.items():
+            out.histogram('queue_stage_seconds', histogram, camera=camera_id, stage=stage)
+
+    out.family('queue_frames_total', 'counter', 'Frames read, inferred, skipped by the motion gate and emitted')
+    for camera_id, monitor in monitors:
+        for event, value in monitor.metrics.frames.items():
+            out.sample('queue_frames_total', value, camera=camera_id, event=event)
+
+    queues = [(camera_id, monitor.metrics.queues(monitor.stage_queues)) for camera_id, monitor in monitors]
+    out.family('queue_depth', 'gauge', 'Frames waiting between pipeline stages')
+    for camera_id, stats in queues:
+        for name, q in stats.items():
+            out.sample('queue_depth', q['depth'], camera=camera_id, queue=name)
+    out.family('queue_dropped_frames_total', 'counter', 'Stale frames dropped between pipeline stages')
+    for camera_id, stats in queues:
+        for name, q in stats.items():
+            out.sample('queue_dropped_frames_total', q['dropped'], camera=camera_id, queue=name)
+
+    out.family('queue_clients', 'gauge', 'Connected dashboards')
+    out.sample('queue_clients', manager.client_count)
+
+    clients = manager.outbound.stats()
+    out.family('client_events_sent_total', 'counter', 'Events sent to dashboards')
+    out.sample('client_events_sent_total', clients['sent'])
+    out.family('client_updates_coalesced_total', 'counter', 'Updates replaced by a newer one before a slow client took them')
+    out.sample('client_updates_coalesced_total', clients['coalesced'])
+    out.family('client_events_dropped_total', 'counter', 'Events dropped because a client queue was full')
+    out.sample('client_events_dropped_total', clients['dropped'])
+    out.family('client_ack_timeouts_total', 'counter', 'Updates a client did not acknowledge in time')
+    out.sample('client_ack_timeouts_total', clients['ack_timeouts'])
+    out.family('client_updates_in_flight', 'gauge', 'Updates sent and not yet acknowledged')
+    out.sample('client_updates_in_flight', sum(client['in_flight'] for client in clients['clients']))
+
+    detector = manager.detector.stats()
+    out.family('detector_batches_total', 'counter', 'Detector calls')
+    out.sample('detector_batches_total', detector['batches'])
+    out.family('detector_frames_total', 'counter', 'Frames run through the detector')
+    out.sample('detector_frames_total', detector['frames'])
+    out.family('detector_pending', 'gauge', 'Frames waiting for the next detector batch')
+    out.sample('detector_pending', detector['pending'])
+
+    if stats_store is not None:
+        store = stats_store.stats()
+        out.family('stats_store_rows_written_total', 'counter', 'Statistics rows persisted')
+        out.sample('stats_store_rows_written_total', store['written'])
+        out.family('stats_store_dropped_total', 'counter', 'Statistics rows dropped because the writer fell behind')
+        out.sample('stats_store_dropped_total', store['dropped'])
+
+    return out.text()
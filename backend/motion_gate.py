@@ -0,0 +1,99 @@
+"""
+Motion Gate
+Cheap per-zone frame differencing on a downscaled grayscale image, used to
+skip the detector while nothing changes inside the configured zones
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decides per frame whether the detector needs to run again"""
+
+    def __init__(self, width=160, pixel_threshold=25, min_changed_ratio=0.01,
+                 refresh_interval=2.0, enabled=True):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.refresh_interval = refresh_interval
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        """Forget the reference frame so the next frame is always inferred"""
+        self.reference = None
+        self.labels = None
+        self.zone_map = None
+        self.zone_areas = None
+        self.last_inference = 0.0
+        self.checked = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.forced = 0
+
+    def downscale(self, frame):
+        """Small blurred grayscale copy of the frame"""
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def compile_labels(self, zone_map, shape):
+        """Downscale the zone raster to the gate resolution"""
+        height, width = shape
+        labels = cv2.resize(zone_map.raster, (width, height), interpolation=cv2.INTER_NEAREST)
+        if not labels.any():
+            # No zone pixels: watch the whole frame as a single region
+            labels = np.ones_like(labels)
+        self.labels = labels
+        self.zone_map = zone_map
+        self.zone_areas = np.bincount(labels.ravel(), minlength=len(zone_map.names))
+
+    def should_infer(self, frame, zone_map):
+        """True when a zone changed since the last inference or a refresh is due"""
+        self.checked += 1
+        if not self.enabled:
+            self.inferred += 1
+            return True
+
+        small = self.downscale(frame)
+        now = time.monotonic()
+
+        if (self.reference is None or self.zone_map is not zone_map
+                or self.reference.shape != small.shape):
+            self.compile_labels(zone_map, small.shape)
+            return self.mark_inferred(small, now)
+
+        if now - self.last_inference >= self.refresh_interval:
+            self.forced += 1
+            return self.mark_inferred(small, now)
+
+        # Compare against the last inferred frame so slow drift still accumulates
+        changed = cv2.absdiff(small, self.reference) > self.pixel_threshold
+        changed_per_zone = np.bincount(self.labels[changed], minlength=len(self.zone_areas))
+        ratios = changed_per_zone[1:] / np.maximum(self.zone_areas[1:], 1)
+        if ratios.size and ratios.max() >= self.min_changed_ratio:
+            return self.mark_inferred(small, now)
+
+        self.skipped += 1
+        return False
+
+    def mark_inferred(self, small, now):
+        self.reference = small
+        self.last_inference = now
+        self.inferred += 1
+        return True
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'checked': self.checked,
+            'inferred': self.inferred,
+            'skipped': self.skipped,
+            'forced': self.forced,
+            'saved_ratio': round(self.skipped / self.checked, 3) if self.checked else 0.0
+        }
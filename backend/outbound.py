@@ -0,0 +1,206 @@
+"""
+Outbound Socket.IO Delivery
+Per-client outbound queues between the camera monitors and Socket.IO.
+Frequent updates (queue_update, video_frame, queue_data) are coalesced so a client only
+ever has the latest one of each camera waiting; they go out at most max_rate
+times a second, with a bounded number awaiting the client's acknowledgement.
+Other events keep their order. A single dispatcher thread does the sends, so
+monitor threads never wait on a slow client
+"""
+
+import threading
+import time
+from collections import deque
+
+COALESCED_EVENTS = ('queue_update', 'video_frame', 'queue_data')
+
+
+def sooner(wait, seconds):
+    return seconds if wait is None else min(wait, seconds)
+
+
+class ClientChannel:
+    """Outbound state of one connected client"""
+
+    def __init__(self, sid, max_rate=None, max_in_flight=4, max_queued=64):
+        self.sid = sid
+        self.max_rate = max_rate  # coalesced updates per second, per camera and event
+        self.max_in_flight = max_in_flight
+        self.latest = {}  # (event, camera) -> newest payload not sent yet
+        self.next_send = {}  # (event, camera) -> earliest time the next one may go out
+        self.ordered = deque()  # other events, in order
+        self.max_queued = max_queued
+        self.in_flight = {}  # ack token -> time sent
+        self.rooms = set()
+        self.sent = 0
+        self.acked = 0
+        self.coalesced = 0  # replaced by a newer update before going out
+        self.dropped = 0  # ordered events beyond max_queued
+        self.ack_timeouts = 0
+        self.ack_ms = None  # latest acknowledgement round trip
+
+    def put(self, event, data):
+        if event in COALESCED_EVENTS:
+            key = (event, data.get('camera') if isinstance(data, dict) else None)
+            if key in self.latest:
+                self.coalesced += 1
+            self.latest[key] = data
+        elif len(self.ordered) >= self.max_queued:
+            self.dropped += 1
+        else:
+            self.ordered.append((event, data))
+
+    def due(self, key, now):
+        return len(self.in_flight) < self.max_in_flight and now >= self.next_send.get(key, 0.0)
+
+    def stats(self):
+        return {
+            'sid': self.sid,
+            'max_rate': self.max_rate,
+            'waiting': len(self.latest) + len(self.ordered),
+            'in_flight': len(self.in_flight),
+            'sent': self.sent,
+            'acked': self.acked,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'ack_timeouts': self.ack_timeouts,
+            'ack_ms': self.ack_ms
+        }
+
+
+class Outbound:
+    """Drop-in for socketio.emit that delivers through per-client channels"""
+
+    COUNTERS = ('sent', 'acked', 'coalesced', 'dropped', 'ack_timeouts')
+
+    def __init__(self, socketio, max_rate=None, max_in_flight=4, ack_timeout=2.0, max_queued=64):
+        self.socketio = socketio
+        self.max_rate = max_rate or None
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.ack_timeout = ack_timeout
+        self.max_queued = max_queued
+        self.channels = {}
+        self.departed = dict.fromkeys(self.COUNTERS, 0)  # totals of disconnected clients
+        self.next_token = 0
+        self.condition = threading.Condition()
+        self.worker = None
+
+    def start(self):
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._run, name='outbound', daemon=True)
+            self.worker.start()
+        return self
+
+    def connect(self, sid):
+        with self.condition:
+            self.channels[sid] = ClientChannel(sid, self.max_rate, self.max_in_flight, self.max_queued)
+
+    def disconnect(self, sid):
+        with self.condition:
+            channel = self.channels.pop(sid, None)
+            if channel is not None:
+                for name in self.COUNTERS:
+                    self.departed[name] += getattr(channel, name)
+
+    def join(self, sid, room):
+        with self.condition:
+            if sid in self.channels:
+                self.channels[sid].rooms.add(room)
+
+    def leave(self, sid, room):
+        with self.condition:
+            if sid in self.channels:
+                self.channels[sid].rooms.discard(room)
+
+    def configure(self, sid, max_rate=None):
+        """Per-client rate cap (e.g. a tablet asking for fewer updates); never above the server's"""
+        with self.condition:
+            channel = self.channels.get(sid)
+            if channel is not None:
+                if max_rate and self.max_rate:
+                    max_rate = min(max_rate, self.max_rate)
+                channel.max_rate = max_rate or self.max_rate
+                self.condition.notify()
+
+    def emit(self, event, data=None, to=None, **kwargs):
+        """Queue an event for every client (or one sid / room) and return at once"""
+        to = to or kwargs.get('room')
+        with self.condition:
+            for channel in self.channels.values():
+                if to is None or to == channel.sid or to in channel.rooms:
+                    channel.put(event, data)
+            self.condition.notify()
+
+    def ack(self, sid, token, *args):
+        with self.condition:
+            channel = self.channels.get(sid)
+            if channel is not None:
+                sent = channel.in_flight.pop(token, None)
+                if sent is not None:
+                    channel.acked += 1
+                    channel.ack_ms = round((time.monotonic() - sent) * 1000, 1)
+                    self.condition.notify()
+
+    def _collect(self, now):
+        """Events ready to send now, and how long until the next one might be"""
+        ready = []
+        wait = None
+        for channel in self.channels.values():
+            # A client that never acknowledges still gets updates, slowly
+            for token, sent in list(channel.in_flight.items()):
+                if now - sent >= self.ack_timeout:
+                    del channel.in_flight[token]
+                    channel.ack_timeouts += 1
+                else:
+                    wait = sooner(wait, sent + self.ack_timeout - now)
+
+            while channel.ordered:
+                event, data = channel.ordered.popleft()
+                ready.append((channel.sid, event, data, None))
+                channel.sent += 1
+
+            for key in list(channel.latest):
+                if not channel.due(key, now):
+                    if len(channel.in_flight) < channel.max_in_flight:
+                        wait = sooner(wait, channel.next_send[key] - now)
+                    continue
+                self.next_token += 1
+                channel.in_flight[self.next_token] = now
+                if channel.max_rate:
+                    channel.next_send[key] = now + 1.0 / channel.max_rate
+                ready.append((channel.sid, key[0], channel.latest.pop(key), self.next_token))
+                channel.sent += 1
+        return ready, wait
+
+    def _run(self):
+        while True:
+            with self.condition:
+                ready, wait = self._collect(time.monotonic())
+                if not ready:
+                    self.condition.wait(wait)
+                    continue
+
+            for sid, event, data, token in ready:
+                callback = None
+                if token is not None:
+                    callback = lambda *args, sid=sid, token=token: self.ack(sid, token, *args)
+                try:
+                    self.socketio.emit(event, data, to=sid, callback=callback)
+                except Exception as e:
+                    print(f"⚠️ Failed to send {event} to {sid}: {e}")
+
+    def stats(self):
+        """Totals over every client that has connected, plus each current client"""
+        with self.condition:
+            clients = [channel.stats() for channel in self.channels.values()]
+            totals = dict(self.departed)
+        for client in clients:
+            for name in self.COUNTERS:
+                totals[name] += client[name]
+        return {
+            'connected': len(clients),
+            'max_rate': self.max_rate,
+            'max_in_flight': self.max_in_flight,
+            **totals,
+            'clients': clients
+        }
@@ -0,0 +1,154 @@
+"""
+Staged Frame Pipeline
+Bounded "latest frame wins" queues, worker threads and a frame buffer pool
+used to overlap capture, inference, annotation and encoding in QueueMonitor.run
+"""
+
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class LatestQueue:
+    """Bounded queue that drops the oldest item instead of blocking the producer"""
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item):
+        """Enqueue item, discarding the oldest pending item when full"""
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        stale = self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        continue
+                    if self.on_drop:
+                        self.on_drop(stale)
+
+    def get(self, timeout=None):
+        """Dequeue the next item (raises queue.Empty on timeout)"""
+        return self._queue.get(timeout=timeout)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def clear(self):
+        """Drop everything still pending"""
+        with self._lock:
+            while True:
+                try:
+                    stale = self._queue.get_nowait()
+                except queue.Empty:
+                    return
+                if self.on_drop:
+                    self.on_drop(stale)
+
+
+class FramePool:
+    """Recycles frame-sized output buffers between pipeline stages"""
+
+    def __init__(self, max_free=4):
+        self.max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+        self.allocated = 0
+
+    def acquire(self, shape, dtype):
+        """Return a free buffer of this shape, allocating one if none is left"""
+        with self._lock:
+            while self._free:
+                buffer = self._free.pop()
+                if buffer.shape == shape and buffer.dtype == dtype:
+                    return buffer
+            self.allocated += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer):
+        """Hand a buffer back once nothing reads it any more"""
+        if buffer is None:
+            return
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(buffer)
+
+
+class Stage(threading.Thread):
+    """Worker thread that takes packets from an inbox, processes them and passes them on"""
+
+    def __init__(self, name, func, inbox, outbox, stop_event, on_error=None, poll_interval=0.1,
+                 timer=None):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.on_error = on_error
+        self.poll_interval = poll_interval
+        self.timer = timer  # optional histogram of time spent per packet
+        self.processed = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                packet = self.inbox.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+
+            started = time.perf_counter()
+            try:
+                result = self.func(packet)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(self.name, e)
+                self.stop_event.set()
+                return
+
+            if self.timer is not None:
+                self.timer.observe(time.perf_counter() - started)
+            self.processed += 1
+            if result is not None and self.outbox is not None:
+                self.outbox.put(result)
+
+
+class SourceStage(threading.Thread):
+    """Worker thread that produces packets (e.g. camera capture) into an outbox"""
+
+    def __init__(self, name, func, outbox, stop_event, on_error=None, timer=None):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.on_error = on_error
+        self.timer = timer
+        self.produced = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            try:
+                packet = self.func()
+            except StopIteration:
+                self.stop_event.set()
+                return
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(self.name, e)
+                self.stop_event.set()
+                return
+
+            if self.timer is not None:
+                self.timer.observe(time.perf_counter() - started)
+            if packet is not None:
+                self.produced += 1
+                self.outbox.put(packet)
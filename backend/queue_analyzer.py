@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Offline Queue Analysis
+Runs QueueMonitor's detection and zone logic over recorded videos with no
+drawing, encoding or history buffers. Videos (and time segments of long
+videos) are spread over worker processes; segments are merged back per
+video. Writes per-video statistics (CSV + columnar .npz) and a summary table
+"""
+
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from batching import BatchedDetector
+from config_store import zone_configs
+from detector_backends import BACKEND_NAMES, load_detector_config
+from history import HISTORY_FIELDS
+from queue_monitor import detect_people, queue_statistics
+from zone_map import ZoneCrops, ZoneMap
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v')
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, 'data', 'results', 'offline')
+
+# Auto-split videos into segments no shorter than this
+MIN_SEGMENT_SECONDS = 60
+
+# Per-process frame analyzer, created once by the pool initializer
+_analyzer = None
+
+
+class FrameAnalyzer:
+    """The detector plus the zone raster (and crops) compiled per frame size"""
+
+    def __init__(self, detector, zones, roi_crops=False, tile_size=None):
+        self.detector = detector
+        self.zones = zones
+        self.roi_crops = roi_crops
+        self.tile_size = tile_size
+        self.zone_map = None
+        self.zone_crops = None
+
+    def compile(self, width, height):
+        if self.zone_map is None or not self.zone_map.matches(width, height):
+            self.zone_map = ZoneMap(self.zones, width, height)
+            if self.roi_crops or self.tile_size:
+                self.zone_crops = ZoneCrops(self.zones, width, height, tile_size=self.tile_size,
+                                            roi=self.roi_crops)
+        return self.zone_map, self.zone_crops
+
+    def analyze(self, frame):
+        """Queue statistics of one frame"""
+        height, width = frame.shape[:2]
+        zone_map, crops = self.compile(width, height)
+        detections = detect_people(self.detector, frame, crops)
+        return queue_statistics(detections.assign_zones(zone_map))
+
+
+def init_worker(zones_file, conf, threads, detector_config=None, roi_crops=False, tile_size=None):
+    """Load the model and zones once per worker process"""
+    global _analyzer
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    detector = make_detector(conf, threads, detector_config or {})
+    if not detector.load():
+        raise RuntimeError('Failed to load AI model')
+    zones = zone_configs.get(zones_file)
+    if not zones.exists or not zones.zones:
+        raise RuntimeError(f'No zones configured in {zones_file}')
+    _analyzer = FrameAnalyzer(detector, zones.zones, roi_crops, tile_size)
+
+
+def make_detector(conf, threads, detector_config):
+    """Single-frame detector on the configured backend"""
+    return BatchedDetector(model_path=detector_config.get('model', 'yolov8n.pt'),
+                           backend=detector_config.get('backend', 'ultralytics'),
+                           int8=detector_config.get('int8', False),
+                           imgsz=detector_config.get('imgsz', 640),
+                           threads=threads, conf=conf, max_batch_size=1)
+
+
+def find_videos(inputs):
+    """Expand files and directories into a sorted list of videos"""
+    videos = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    videos.append(os.path.join(path, name))
+        else:
+            videos.extend(sorted(glob.glob(path)) or [path])
+    return videos
+
+
+def resolve_zones_file(zones_file):
+    """Accept a path or a file name inside config/"""
+    if os.path.exists(zones_file):
+        return zones_file
+    candidate = os.path.join(BASE_DIR, 'config', os.path.basename(zones_file))
+    return candidate if os.path.exists(candidate) else zones_file
+
+
+def video_info(video_path):
+    """Frame count and FPS of a video"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f'Cannot open video: {video_path}')
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        cap.release()
+
+
+def seek(cap, target):
+    """Position cap on frame `target`; returns the index of the next frame read"""
+    if target <= 0:
+        return 0
+
+    # The position the backend reports after seeking is trusted; when it
+    # lands short the gap is grabbed forward, past it decoding restarts
+    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if position > target:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        position = 0
+    while position < target and cap.grab():
+        position += 1
+    return position
+
+
+def analyze_segment(video_path, start_frame=0, end_frame=None, stride=1):
+    """Detect people in frames [start_frame, end_frame) of a video"""
+    analyzer = _analyzer
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f'Cannot open video: {video_path}')
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    rows = []
+    started = time.perf_counter()
+    try:
+        frame_idx = seek(cap, start_frame) - 1
+        while end_frame is None or frame_idx + 1 < end_frame:
+            # grab() skips decoding of the frames we stride over
+            if not cap.grab():
+                break
+            frame_idx += 1
+            if frame_idx % stride:
+                continue
+            ok, frame = cap.retrieve()
+            if not ok:
+                break
+
+            stats = analyzer.analyze(frame)
+            frames.append(frame_idx)
+            rows.append([stats[field] for field in HISTORY_FIELDS])
+    finally:
+        cap.release()
+
+    return {
+        'video': video_path,
+        'start': start_frame,
+        'fps': fps,
+        'frames': np.asarray(frames, dtype=np.int64),
+        'values': np.asarray(rows, dtype=np.float32).reshape(len(rows), len(HISTORY_FIELDS)),
+        'elapsed': time.perf_counter() - started
+    }
+
+
+def plan_segments(total_frames, fps, segments, stride=1):
+    """Split [0, total_frames) into up to `segments` stride-aligned ranges"""
+    min_frames = int(MIN_SEGMENT_SECONDS * fps)
+    segments = max(1, min(segments, total_frames // max(min_frames, 1)))
+    if segments == 1 or total_frames <= 0:
+        return [(0, None)]
+
+    # Starts are multiples of stride so every segment samples the same frames
+    # a sequential run would
+    bounds = [int(total_frames * i / segments) // stride * stride for i in range(segments)]
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:] + [None]) if end is None or end > start]
+    return ranges
+
+
+def merge_segments(results):
+    """Concatenate a video's (disjoint) segment results in order"""
+    results = sorted(results, key=lambda r: r['start'])
+    frames = np.concatenate([r['frames'] for r in results])
+    values = np.concatenate([r['values'] for r in results])
+    return frames, values, sum(r['elapsed'] for r in results)
+
+
+def finish_video(video_path, results, output_dir):
+    """Merge segments, write the video's statistics and return its summary"""
+    fps = results[0]['fps']
+    frame_numbers, values, elapsed = merge_segments(results)
+    times = frame_numbers / fps
+
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    write_outputs(os.path.join(output_dir, name), frame_numbers, times, values)
+    summary = summarize(video_path, fps, frame_numbers, times, values, elapsed)
+    summary['segments'] = len(results)
+    return summary
+
+
+def write_outputs(base_path, frame_numbers, times, values):
+    """Per-video CSV (frame, time_sec, stats...) and columnar .npz"""
+    with open(base_path + '_statistics.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['frame', 'time_sec'] + list(HISTORY_FIELDS))
+        for frame, t, row in zip(frame_numbers.tolist(), times.tolist(), values.tolist()):
+            writer.writerow([frame, f"{t:.3f}"] + [f"{v:g}" for v in row])
+
+    columns = {field: values[:, i] for i, field in enumerate(HISTORY_FIELDS)}
+    np.savez_compressed(base_path + '_statistics.npz', frame=frame_numbers, timestamp=times, **columns)
+
+
+def summarize(video_path, fps, frame_numbers, times, values, elapsed):
+    in_queue = values[:, HISTORY_FIELDS.index('inQueue')] if len(values) else np.zeros(1)
+    people = values[:, HISTORY_FIELDS.index('totalPeople')] if len(values) else np.zeros(1)
+    return {
+        'video': os.path.basename(video_path),
+        'frames': int(len(frame_numbers)),
+        'duration_sec': round(float(times[-1]) if len(times) else 0.0, 2),
+        'source_fps': round(fps, 2),
+        'avg_people': round(float(people.mean()), 2),
+        'max_people': int(people.max()),
+        'avg_in_queue': round(float(in_queue.mean()), 2),
+        'max_in_queue': int(in_queue.max()),
+        'processing_sec': round(elapsed, 2),
+        'processing_fps': round(len(frame_numbers) / elapsed, 2) if elapsed > 0 else 0.0
+    }
+
+
+def write_summary(output_dir, summaries):
+    path = os.path.join(output_dir, 'summary.csv')
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summaries[0].keys()))
+        writer.writeheader()
+        writer.writerows(summaries)
+    return path
+
+
+def run(videos, zones_file, output_dir, workers, stride=1, conf=0.45, segments=None,
+        detector_config=None, roi_crops=False, tile_size=None):
+    """Analyze videos in parallel, splitting long videos into segments"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Enough segments per video to keep every worker busy
+    if segments is None:
+        segments = max(1, -(-workers // len(videos)))
+    tasks = []
+    for video in videos:
+        try:
+            total_frames, fps = video_info(video)
+        except RuntimeError as e:
+            print(f"❌ {os.path.basename(video)}: {e}")
+            continue
+        tasks += [(video, start, end) for start, end in plan_segments(total_frames, fps, segments, stride)]
+
+    failures = len(videos) - len({video for video, _, _ in tasks})
+    if not tasks:
+        return failures
+
+    workers = max(1, min(workers, len(tasks)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    pending = {}
+    for video, _, _ in tasks:
+        pending[video] = pending.get(video, 0) + 1
+
+    results = {}
+    failed = set()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(zones_file, conf, threads, detector_config, roi_crops,
+                                       tile_size)) as pool:
+        futures = {pool.submit(analyze_segment, video, start, end, stride): video
+                   for video, start, end in tasks}
+        for future in as_completed(futures):
+            video = futures[future]
+            pending[video] -= 1
+            try:
+                results.setdefault(video, []).append(future.result())
+            except Exception as e:
+                failed.add(video)
+                print(f"❌ {os.path.basename(video)}: {e}")
+
+            if pending[video] or video in failed:
+                continue
+            summary = finish_video(video, results.pop(video), output_dir)
+            summaries.append(summary)
+            print(f"✅ {summary['video']}: {summary['frames']} frames in {summary['segments']} segment(s), "
+                  f"avg queue {summary['avg_in_queue']}, {summary['processing_fps']} FPS")
+
+    if summaries:
+        summaries.sort(key=lambda s: s['video'])
+        print(f"📊 Summary written to {write_summary(output_dir, summaries)}")
+    return failures + len(failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline queue analysis of recorded videos')
+    parser.add_argument('inputs', nargs='+', help='Video files, globs or directories of videos')
+    parser.add_argument('--zones-file', default='zones.json', help='Zones JSON (path or name in config/)')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='Where statistics are written')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--stride', type=int, default=1, help='Analyze every Nth frame')
+    parser.add_argument('--conf', type=float, default=0.45, help='Detection confidence threshold')
+    parser.add_argument('--backend', choices=BACKEND_NAMES, default=None,
+                        help='Detector backend (default: config/detector.json, else ultralytics)')
+    parser.add_argument('--model', default=None, help='Model weights or exported model')
+    parser.add_argument('--int8', action='store_true', default=None, help='Use the INT8-quantized export')
+    parser.add_argument('--roi-crops', action='store_true',
+                        help='Detect only in crops around the zones instead of the whole frame')
+    parser.add_argument('--tile-size', type=int, default=None,
+                        help='Detect in overlapping tiles of this size covering the frame (the zone crops '
+                             'with --roi-crops), for high-resolution recordings')
+    parser.add_argument('--segments', type=int, default=None,
+                        help='Segments per video (default: enough to keep every worker busy; '
+                             f'segments are at least {MIN_SEGMENT_SECONDS}s long)')
+    parser.add_argument('--skip-drawing', action='store_true',
+                        help='Accepted for compatibility; offline analysis never draws')
+    args = parser.parse_args()
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("❌ No videos found")
+        return 1
+
+    zones_file = resolve_zones_file(args.zones_file)
+    detector_config = load_detector_config(os.path.join(BASE_DIR, 'config', 'detector.json'),
+                                           {'backend': args.backend, 'model': args.model, 'int8': args.int8})
+    print(f"🎬 Analyzing {len(videos)} video(s) with {min(args.workers, len(videos))} worker(s) "
+          f"on {detector_config['backend']}")
+    started = time.perf_counter()
+    failures = run(videos, zones_file, args.output_dir, args.workers, max(1, args.stride), args.conf,
+                   args.segments, detector_config, args.roi_crops, args.tile_size)
+    print(f"⏱️ Done in {time.perf_counter() - started:.1f}s")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,49 +5,143 @@ Captures video from camera, detects people, tracks them, and sends data to dashb
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
-import json
 import time
 import base64
-from collections import defaultdict
-import os
+import threading
+
+from batching import BatchedDetector
+from config_store import zone_configs
+from detections import DetectionBatch
+from history import StatsHistory
+from metrics import MonitorMetrics
+from motion_gate import MotionGate
+from pipeline import FramePool, LatestQueue, Stage, SourceStage
+from streaming import FrameEncoder
+from zone_map import ZoneCrops, ZoneMap, ZoneOverlay
+
+def video_room(camera_id):
+    """Socket.IO room of the clients watching a camera's raw frames"""
+    return f'video:{camera_id}'
+
+def detect_people(detector, frame, crops=None):
+    """Detections of one frame in frame coordinates, on the whole frame or the given crops"""
+    height, width = frame.shape[:2]
+    # Run detection (batched with the other cameras) on the configured backend
+    if crops is None or (crops.full_frame and not crops.tiled):
+        return detector.detect(frame)
+    # Crops and tiles run at their own stride-aligned size, never upscaled
+    results = detector.detect_many(crops.crop(frame), native=True)
+    if crops.tiled:
+        # Overlapping tiles in one batch, merged with cross-tile NMS
+        return DetectionBatch.from_tiles(results, crops.rects, width, height)
+    # Only the regions around the zones
+    return DetectionBatch.concatenate(results, [rect[:2] for rect in crops.rects])
+
+def queue_statistics(detections):
+    """Calculate queue statistics from zone-assigned detections"""
+    zone_counts = detections.zone_counts()
+    names = detections.zone_names
+    
+    # Separate by zone type
+    in_queue = int(sum(zone_counts[i] for i, zone in enumerate(names)
+                       if 'queue' in zone.lower()))
+    at_cashdesk = int(sum(zone_counts[i] for i, zone in enumerate(names)
+                          if 'cashdesk' in zone.lower() or 'caisse' in zone.lower()))
+    
+    total_people = len(detections)
+    
+    # Mock wait times (would need tracking for real values)
+    avg_wait_time = int(in_queue * 15) if in_queue > 0 else 0
+    max_wait_time = int(avg_wait_time * 1.5) if avg_wait_time > 0 else 0
+    
+    return {
+        'totalPeople': total_people,
+        'inQueue': in_queue,
+        'atCashdesk': at_cashdesk,
+        'completed': 0,  # Would need tracking
+        'avgWaitTime': avg_wait_time,
+        'maxWaitTime': max_wait_time,
+        'alerts': 1 if in_queue > 5 else 0
+    }
 
 class QueueMonitor:
-    def __init__(self, socketio, config_path='config/zones.json'):
+    def __init__(self, socketio, config_path='config/zones.json', camera_id='0', source=0,
+                 detector=None, clients=None, motion_gate=None, transport='mjpeg', encoder=None, history=None,
+                 stats_store=None, config_store=None, watchers=None, raw_frame_fps=2.0,
+                 roi_crops=False, roi_padding=0.1, roi_max_crops=3, capture_size=(640, 480),
+                 tile_size=None, tile_overlap=0.2, max_tiles=8):
         self.socketio = socketio
+        self.clients = clients  # callable returning the number of connected dashboards
+        self.transport = transport  # 'mjpeg' stream only, 'binary' video_frame events, 'base64' or 'geometry'
+        self.watchers = watchers  # callable returning the number of clients watching raw frames
+        self.video_room = video_room(camera_id)
+        self.raw_frame_interval = 1.0 / raw_frame_fps if raw_frame_fps else None
+        self.last_raw_frame = 0.0
+        self.encoder = encoder or FrameEncoder()
+        self.socket_tier = 'full'  # tier sent over the socket in binary/base64 modes
         self.config_path = config_path
+        self.camera_id = str(camera_id)
+        self.source = source
+        self.detector = detector
         self.model = None
-        self.camera = None
         self.running = False
+        self.latest_frame = None  # last frame read by the running pipeline
+        self.config_store = config_store or zone_configs
         self.zones = []
+        self.zones_version = 0
+        self.pending_zones = None
+        self.zone_map = None
+        self.zone_overlay = None
+        self.roi_crops = roi_crops  # detect only in crops around the zones
+        self.roi_padding = roi_padding
+        self.roi_max_crops = roi_max_crops
+        self.capture_size = capture_size  # requested camera (width, height)
+        self.tile_size = tile_size  # slice the frame into tiles of this size (None disables)
+        self.tile_overlap = tile_overlap
+        self.max_tiles = max_tiles
+        self.zone_crops = None
+        self.frame_pool = FramePool()
+        self.motion_gate = motion_gate or MotionGate()
+        self.last_detections = None
+        self.history = history or StatsHistory()
+        self.stats_store = stats_store  # optional persistent columnar store
         self.tracked_objects = {}
         self.frame_count = 0
+        self.queue_size = 1  # "latest frame wins" between pipeline stages
+        self.stop_event = None
+        self.stages = []
+        self.stage_queues = {}
+        self.metrics = MonitorMetrics()
         
+    def has_clients(self):
+        """Whether any dashboard is connected to receive updates"""
+        return self.clients is None or self.clients() > 0
+    
+    def emit(self, event, data=None, room=None):
+        """Send a dashboard event tagged with this monitor's camera id"""
+        payload = {'camera': self.camera_id}
+        if data:
+            payload.update(data)
+        if room is None:
+            self.socketio.emit(event, payload)
+        else:
+            self.socketio.emit(event, payload, to=room)
+    
     def load_model(self):
-        """Load YOLO model"""
-        print("📦 Loading YOLO model...")
-        try:
-            self.model = YOLO('yolov8n.pt')  # Nano model for speed
-            print("✅ YOLO model loaded successfully")
-            return True
-        except Exception as e:
-            print(f"❌ Failed to load YOLO model: {e}")
-            print("💡 Downloading model... This may take a minute...")
-            try:
-                self.model = YOLO('yolov8n.pt')
-                print("✅ Model downloaded and loaded")
-                return True
-            except Exception as e2:
-                print(f"❌ Failed to download model: {e2}")
-                return False
+        """Load YOLO model (shared with other cameras when a detector was given)"""
+        if self.detector is None:
+            self.detector = BatchedDetector()
+        if not self.detector.load():
+            return False
+        self.model = self.detector.model
+        return True
     
     def load_zones(self):
         """Load zone configuration"""
         try:
-            if os.path.exists(self.config_path):
-                with open(self.config_path, 'r') as f:
-                    config = json.load(f)
-                    self.zones = config.get('zones', [])
+            snapshot = self.config_store.get(self.config_path)
+            if snapshot.exists:
+                self.apply_zones(snapshot)
                 print(f"✅ Loaded {len(self.zones)} zones")
                 return True
             else:
@@ -57,25 +151,29 @@ class QueueMonitor:
             print(f"❌ Failed to load zones: {e}")
             return False
     
-    def start_camera(self, camera_id=0):
-        """Start camera capture"""
-        print(f"📹 Starting camera {camera_id}...")
+    def start_camera(self, source=None):
+        """Open camera capture (None on failure); the caller releases it"""
+        if source is None:
+            source = self.source
+        print(f"📹 Starting camera {self.camera_id} ({source})...")
         try:
-            self.camera = cv2.VideoCapture(camera_id)
-            if not self.camera.isOpened():
+            camera = cv2.VideoCapture(source)
+            if not camera.isOpened():
                 print("❌ Failed to open camera")
-                return False
+                camera.release()
+                return None
             
             # Set camera properties
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.camera.set(cv2.CAP_PROP_FPS, 30)
+            width, height = self.capture_size
+            camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            camera.set(cv2.CAP_PROP_FPS, 30)
             
             print("✅ Camera started successfully")
-            return True
+            return camera
         except Exception as e:
             print(f"❌ Failed to start camera: {e}")
-            return False
+            return None
     
     def point_in_polygon(self, point, polygon):
         """Check if point is inside polygon using ray casting"""
@@ -97,62 +195,85 @@ class QueueMonitor:
         
         return inside
     
+    def apply_zones(self, snapshot):
+        """Switch to a zone configuration snapshot (geometry recompiles lazily)"""
+        self.zones = snapshot.zones
+        self.zones_version = snapshot.version
+        self.pending_zones = None
+    
+    def update_zones(self, snapshot):
+        """Queue new zones; the inference stage applies them between frames"""
+        if snapshot.version != self.zones_version:
+            self.pending_zones = snapshot
+    
+    def compile_zones(self, width, height):
+        """Compile zones into a label raster for the given frame size"""
+        zones = self.zones
+        zone_map = self.zone_map
+        if zone_map is None or zone_map.source is not zones or not zone_map.matches(width, height):
+            zone_map = ZoneMap(zones, width, height)
+            self.zone_map = zone_map
+        return zone_map
+    
+    def compile_overlay(self, width, height):
+        """Pre-render zone outlines for the given frame size"""
+        zones = self.zones
+        overlay = self.zone_overlay
+        if overlay is None or overlay.source is not zones or not overlay.matches(width, height):
+            overlay = ZoneOverlay(zones, width, height)
+            self.zone_overlay = overlay
+        return overlay
+    
+    def compile_crops(self, width, height):
+        """Detector crops (around the zones with roi_crops) and tiles for the given frame size"""
+        zones = self.zones
+        crops = self.zone_crops
+        if crops is None or crops.source is not zones or not crops.matches(width, height):
+            crops = ZoneCrops(zones, width, height, padding=self.roi_padding, max_crops=self.roi_max_crops,
+                              tile_size=self.tile_size, tile_overlap=self.tile_overlap, max_tiles=self.max_tiles,
+                              roi=self.roi_crops)
+            self.zone_crops = crops
+        return crops
+    
     def get_zone_for_point(self, point):
         """Get zone name for a point"""
+        if self.zone_map is not None:
+            return self.zone_map.zone_name(self.zone_map.zone_id(point))
+        
         for zone in self.zones:
             polygon = [(p[0], p[1]) for p in zone['polygon']]
             if self.point_in_polygon(point, polygon):
                 return zone['name']
         return 'Unknown'
     
+    def get_zones_for_points(self, points, width, height):
+        """Get zone names for N points with one raster lookup"""
+        return self.compile_zones(width, height).lookup_names(points)
+    
     def process_frame(self, frame):
         """Process single frame with YOLO detection"""
-        # Run YOLO detection
-        results = self.model(frame, conf=0.45, classes=[0])  # class 0 = person
-        
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                conf = float(box.conf[0])
-                
-                # Calculate center point
-                center_x = int((x1 + x2) / 2)
-                center_y = int((y1 + y2) / 2)
-                
-                # Get zone
-                zone = self.get_zone_for_point((center_x, center_y))
-                
-                detections.append({
-                    'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                    'confidence': conf,
-                    'center': (center_x, center_y),
-                    'zone': zone
-                })
+        height, width = frame.shape[:2]
+        crops = self.compile_crops(width, height) if self.roi_crops or self.tile_size else None
+        detections = detect_people(self.detector, frame, crops)
         
-        return detections
+        # Assign every detection to its zone in one lookup
+        return detections.assign_zones(self.compile_zones(width, height))
     
-    def draw_detections(self, frame, detections):
-        """Draw bounding boxes and zones on frame"""
-        # Draw zones
-        for zone in self.zones:
-            polygon = np.array(zone['polygon'], np.int32)
-            cv2.polylines(frame, [polygon], True, (0, 255, 0), 2)
-            
-            # Draw zone name
-            if len(polygon) > 0:
-                cv2.putText(frame, zone['name'], tuple(polygon[0]), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    def draw_detections(self, frame, detections, out=None):
+        """Draw zones and bounding boxes over frame into out (a new array if None)"""
+        # Draw zones from the cached overlay
+        height, width = frame.shape[:2]
+        frame = self.compile_overlay(width, height).render(frame, out)
         
         # Draw detections
-        for det in detections:
-            x1, y1, x2, y2 = det['bbox']
-            conf = det['confidence']
-            zone = det['zone']
+        boxes = detections.xyxy.astype(np.int32).tolist()
+        centers = detections.center.tolist()
+        for (x1, y1, x2, y2), conf, center, zone_id in zip(
+                boxes, detections.conf.tolist(), centers, detections.zone_id.tolist()):
+            zone = detections.zone_names[zone_id]
             
             # Draw bounding box
-            color = (0, 255, 0) if zone != 'Unknown' else (0, 0, 255)
+            color = (0, 255, 0) if zone_id != ZoneMap.UNKNOWN else (0, 0, 255)
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
             
             # Draw label
@@ -161,48 +282,24 @@ class QueueMonitor:
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
             
             # Draw center point
-            cv2.circle(frame, det['center'], 5, (255, 0, 0), -1)
+            cv2.circle(frame, tuple(center), 5, (255, 0, 0), -1)
         
         return frame
     
     def calculate_statistics(self, detections):
         """Calculate queue statistics"""
-        zone_counts = defaultdict(int)
-        for det in detections:
-            zone_counts[det['zone']] += 1
-        
-        # Separate by zone type
-        in_queue = sum(count for zone, count in zone_counts.items() 
-                      if 'queue' in zone.lower())
-        at_cashdesk = sum(count for zone, count in zone_counts.items() 
-                         if 'cashdesk' in zone.lower() or 'caisse' in zone.lower())
-        
-        total_people = len(detections)
-        
-        # Mock wait times (would need tracking for real values)
-        avg_wait_time = int(in_queue * 15) if in_queue > 0 else 0
-        max_wait_time = int(avg_wait_time * 1.5) if avg_wait_time > 0 else 0
-        
-        return {
-            'totalPeople': total_people,
-            'inQueue': in_queue,
-            'atCashdesk': at_cashdesk,
-            'completed': 0,  # Would need tracking
-            'avgWaitTime': avg_wait_time,
-            'maxWaitTime': max_wait_time,
-            'alerts': 1 if in_queue > 5 else 0
-        }
+        return queue_statistics(detections)
     
     def create_customers_list(self, detections):
-        """Create customer list from detections"""
+        """Create customer list from detections (JSON boundary)"""
+        wait_times = np.random.randint(10, 120, size=len(detections)).tolist()  # Mock wait times
         customers = []
-        for i, det in enumerate(detections):
-            wait_time = np.random.randint(10, 120)  # Mock wait time
-            status = 'alert' if wait_time > 90 else 'waiting' if 'queue' in det['zone'].lower() else 'serving'
+        for i, (zone, wait_time) in enumerate(zip(detections.zones(), wait_times)):
+            status = 'alert' if wait_time > 90 else 'waiting' if 'queue' in zone.lower() else 'serving'
             
             customers.append({
                 'id': i + 1,
-                'zone': det['zone'],
+                'zone': zone,
                 'waitTime': wait_time,
                 'status': status,
                 'hasAlert': wait_time > 90
@@ -210,110 +307,258 @@ class QueueMonitor:
         
         return customers
     
+    def frame_to_jpeg(self, frame, quality=80):
+        """Encode frame as JPEG bytes"""
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes()
+    
     def frame_to_base64(self, frame):
         """Convert frame to base64 for transmission"""
-        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        jpg_as_text = base64.b64encode(buffer).decode('utf-8')
+        jpg_as_text = base64.b64encode(self.frame_to_jpeg(frame)).decode('utf-8')
         return jpg_as_text
     
+    def capture_stage(self, camera):
+        """Read the next camera frame (pipeline source)"""
+        ret, frame = camera.read()
+        if not ret:
+            print("❌ Failed to read frame")
+            raise StopIteration
+
+        self.latest_frame = frame
+        self.frame_count += 1
+        self.metrics.count('read')
+
+        now = time.time()
+        return {
+            'frame': self.frame_count,
+            'time': now,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)),
+            'image': frame
+        }
+
+    def inference_stage(self, packet):
+        """Detect people and compute statistics for a captured frame"""
+        # Hot-reload zones saved since the last frame
+        pending = self.pending_zones
+        if pending is not None:
+            self.apply_zones(pending)
+            print(f"🔄 Camera {self.camera_id}: reloaded {len(self.zones)} zones (v{self.zones_version})")
+        
+        image = packet['image']
+        height, width = image.shape[:2]
+        zone_map = self.compile_zones(width, height)
+        
+        # Reuse the previous detections while nothing moves inside the zones
+        if self.motion_gate.should_infer(image, zone_map) or self.last_detections is None:
+            self.last_detections = self.metrics.stages['detect'].time(self.process_frame, image)
+            self.metrics.count('inferred')
+        else:
+            self.metrics.count('skipped')
+        detections = self.last_detections
+        packet['detections'] = detections
+        packet['stats'] = self.calculate_statistics(detections)
+        self.history.append(packet['time'], packet['stats'])
+        if self.stats_store is not None:
+            self.stats_store.append(self.camera_id, packet['time'], packet['stats'])
+        return packet
+
+    def video_tiers(self):
+        """Encoding tiers someone is currently watching"""
+        send_frame = self.transport in ('binary', 'base64') and self.has_clients()
+        return self.encoder.wanted([self.socket_tier] if send_frame else ())
+    
+    def annotate_stage(self, packet):
+        """Draw zones and detections into a pooled output buffer"""
+        # Tiers are decided once per frame and reused by encode_stage, so a
+        # viewer joining in between cannot get an unannotated frame
+        packet['tiers'] = self.video_tiers()
+        # Nobody is watching video, so there is nothing to draw
+        if not packet['tiers']:
+            return packet
+        image = packet['raw'] = packet['image']
+        buffer = self.frame_pool.acquire(image.shape, image.dtype)
+        packet['image'] = packet['buffer'] = self.draw_detections(image, packet['detections'], buffer)
+        return packet
+    
+    def release_packet(self, packet):
+        """Return an annotated packet's buffer to the pool"""
+        self.frame_pool.release(packet.pop('buffer', None))
+
+    def encode_stage(self, packet):
+        """Encode the annotated frame and send the update to the dashboard"""
+        # Per-customer dicts are only built when a dashboard is listening
+        customers = self.create_customers_list(packet['detections']) if self.has_clients() else []
+        
+        data = {
+            'frame': packet['frame'],
+            'timestamp': packet['timestamp'],
+            'time': round(packet['time'], 3),  # capture time (epoch seconds), for latency
+            'stats': packet['stats'],
+            'customers': customers
+        }
+        
+        # Encode each subscribed tier once (in the encoder pool) and share the
+        # bytes between the socket and every MJPEG reader
+        try:
+            encoded = self.encoder.encode(packet['image'], packet['tiers'])
+        finally:
+            self.release_packet(packet)
+        jpeg = encoded.get(self.socket_tier)
+        send_frame = jpeg is not None and self.transport in ('binary', 'base64')
+        
+        if send_frame and self.transport == 'base64':
+            data['videoFrame'] = base64.b64encode(jpeg).decode('utf-8')
+        
+        if self.transport == 'geometry':
+            # Boxes and zone ids only; the dashboard draws the overlay itself
+            raw = packet.get('raw', packet['image'])
+            height, width = raw.shape[:2]
+            data['detections'] = dict(packet['detections'].to_geometry(), size=[width, height])
+            data['zonesVersion'] = self.zones_version
+        
+        self.metrics.stages['emit'].time(self.emit_update, packet, data, jpeg if send_frame else None)
+        self.metrics.count('emitted')
+        return None
+    
+    def emit_update(self, packet, data, jpeg):
+        """Send queue_update and, depending on the transport, the video frame"""
+        self.emit('queue_update', data)
+        
+        if jpeg is not None and self.transport == 'binary':
+            # Raw JPEG goes out as a Socket.IO binary attachment on its own event
+            self.emit('video_frame', {'frame': packet['frame'], 'jpeg': jpeg})
+        elif self.transport == 'geometry' and self.raw_frame_due():
+            # Unannotated frames at a low rate, only to clients watching video
+            raw = packet.get('raw', packet['image'])
+            jpeg = self.encoder.encode_tier(raw, self.socket_tier)
+            self.emit('video_frame', {'frame': packet['frame'], 'jpeg': jpeg, 'raw': True},
+                      room=self.video_room)
+    
+    def raw_frame_due(self):
+        """Whether a raw frame should go out to video watchers now"""
+        if self.raw_frame_interval is None or (self.watchers is not None and self.watchers() == 0):
+            return False
+        now = time.monotonic()
+        if now - self.last_raw_frame < self.raw_frame_interval:
+            return False
+        self.last_raw_frame = now
+        return True
+
+    def on_stage_error(self, stage_name, error):
+        """Report a failure raised inside a pipeline stage"""
+        print(f"❌ Error in {stage_name} stage: {error}")
+        self.emit('error', {'message': str(error)})
+
+    def build_pipeline(self, camera, stop_event):
+        """Create capture -> inference -> annotate -> encode stages"""
+        captured = LatestQueue(self.queue_size)
+        detected = LatestQueue(self.queue_size)
+        annotated = LatestQueue(self.queue_size, on_drop=self.release_packet)
+        self.stage_queues = {'capture': captured, 'inference': detected, 'annotate': annotated}
+
+        timers = self.metrics.stages
+        self.stages = [
+            SourceStage('capture', lambda: self.capture_stage(camera), captured,
+                        stop_event, self.on_stage_error, timer=timers['capture']),
+            Stage('inference', self.inference_stage, captured, detected,
+                  stop_event, self.on_stage_error, timer=timers['inference']),
+            Stage('annotate', self.annotate_stage, detected, annotated,
+                  stop_event, self.on_stage_error, timer=timers['annotate']),
+            Stage('encode', self.encode_stage, annotated, None,
+                  stop_event, self.on_stage_error, timer=timers['encode']),
+        ]
+        return self.stages
+
     def run(self):
-        """Main monitoring loop"""
-        print("🚀 Starting queue monitoring...")
+        """Main monitoring loop (False when the model, zones or camera could not be loaded)"""
+        print(f"🚀 Starting queue monitoring on camera {self.camera_id}...")
         self.running = True
+        # This run's stop event and camera stay local, so a run still shutting
+        # down never touches the next one
+        stop_event = self.stop_event = threading.Event()
         self.frame_count = 0
+        self.last_detections = None
+        self.motion_gate.reset()
         
         # Load model and zones
         if not self.load_model():
-            self.socketio.emit('error', {'message': 'Failed to load AI model'})
-            return
+            self.running = False
+            self.emit('error', {'message': 'Failed to load AI model'})
+            return False
         
         if not self.load_zones():
-            self.socketio.emit('error', {'message': 'No zones configured'})
-            return
+            self.running = False
+            self.emit('error', {'message': 'No zones configured'})
+            return False
+        zones_path = self.config_path
+        self.config_store.subscribe(zones_path, self.update_zones)
         
         # Start camera
-        if not self.start_camera():
-            self.socketio.emit('error', {'message': 'Failed to start camera'})
-            return
+        camera = self.start_camera()
+        if camera is None:
+            self.running = False
+            self.config_store.unsubscribe(zones_path, self.update_zones)
+            self.emit('error', {'message': 'Failed to start camera'})
+            return False
         
         # Notify camera started
-        self.socketio.emit('camera_started')
+        self.encoder.open()
+        self.emit('camera_started')
         
+        # Each stage runs in its own worker; bounded queues between them drop
+        # stale frames so throughput follows the slowest stage
+        stages = self.build_pipeline(camera, stop_event)
+        self.detector.attach()
         try:
-            while self.running:
-                ret, frame = self.camera.read()
-                if not ret:
-                    print("❌ Failed to read frame")
-                    break
-                
-                self.frame_count += 1
-                
-                # Process every 2nd frame for performance
-                if self.frame_count % 2 != 0:
-                    continue
-                
-                # Detect people
-                detections = self.process_frame(frame)
-                
-                # Draw on frame
-                annotated_frame = self.draw_detections(frame.copy(), detections)
-                
-                # Calculate statistics
-                stats = self.calculate_statistics(detections)
-                
-                # Create customer list
-                customers = self.create_customers_list(detections)
-                
-                # Convert frame to base64
-                frame_base64 = self.frame_to_base64(annotated_frame)
-                
-                # Send update to dashboard
-                data = {
-                    'frame': self.frame_count,
-                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
-                    'stats': stats,
-                    'customers': customers,
-                    'videoFrame': frame_base64
-                }
-                
-                self.socketio.emit('queue_update', data)
-                
-                # Small delay to control frame rate
-                time.sleep(0.033)  # ~30 FPS
-                
-        except Exception as e:
-            print(f"❌ Error in monitoring loop: {e}")
-            self.socketio.emit('error', {'message': str(e)})
+            for stage in stages:
+                stage.start()
+            
+            while self.running and not stop_event.is_set():
+                stop_event.wait(0.5)
         finally:
-            self.stop()
+            stop_event.set()
+            for stage in stages:
+                stage.join(timeout=5)
+            self.detector.detach()
+            self.metrics.add_dropped(self.stage_queues)
+            self.stage_queues = {}
+            self.config_store.unsubscribe(zones_path, self.update_zones)
+            self.shutdown(camera)
+        return True
     
     def stop(self):
         """Stop monitoring"""
-        print("⏹️ Stopping queue monitoring...")
+        print(f"⏹️ Stopping queue monitoring on camera {self.camera_id}...")
+        self.running = False
+        if self.stop_event:
+            self.stop_event.set()
+    
+    def shutdown(self, camera):
+        """Release the camera once all pipeline stages have exited"""
         self.running = False
-        if self.camera:
-            self.camera.release()
-        self.socketio.emit('camera_stopped')
+        self.latest_frame = None
+        self.encoder.close()
+        camera.release()
+        self.emit('camera_stopped')
         print("✅ Monitoring stopped")
     
     def capture_frame_for_zones(self):
         """Capture a single frame for zone configuration"""
         print("📸 Capturing frame for zone configuration...")
         
-        if not self.camera or not self.camera.isOpened():
-            if not self.start_camera():
+        # A running pipeline owns the camera; use its latest frame
+        frame = self.latest_frame if self.running else None
+        if frame is None:
+            camera = self.start_camera()
+            if camera is None:
+                return None
+            try:
+                ret, frame = camera.read()
+            finally:
+                camera.release()
+            if not ret:
+                print("❌ Failed to capture frame")
                 return None
-        
-        ret, frame = self.camera.read()
-        if not ret:
-            print("❌ Failed to capture frame")
-            return None
         
         # Convert to base64
-        frame_base64 = self.frame_to_base64(frame)
-        
-        # Release camera
-        self.camera.release()
-        self.camera = None
-        
-        return frame_base64
+        return self.frame_to_base64(frame)
@@ -1,98 +1,217 @@
-import csv
+import argparse
+import io
 import os
 import sys
+import time
 
-def analyze(csv_path):
-    if not os.path.exists(csv_path):
-        print(f"CSV file not found: {csv_path}")
-        return 1
+import numpy as np
+
+# Bytes of CSV parsed per chunk; memory stays constant whatever the file size
+CHUNK_BYTES = 8 * 1024 * 1024
+
+
+class QueueCountAnalyzer:
+    """Streaming occupancy / departures / Little's-law accumulator for queue count CSVs"""
 
-    times = []
-    queues = []
+    def __init__(self):
+        self.q_count = None
+        self.frames = 0
+        self.occupancy_sum = None
+        self.departures = None
+        self.total_time = 0.0
+        self.worker_sum = 0
+        self.worker_frames = 0
+        self.worker_min = None
+        self.worker_max = None
+        self.files = {}
 
-    worker_counts = []
-    
-    with open(csv_path, 'r', newline='') as f:
-        reader = csv.reader(f)
-        header = next(reader)
+    def parse_header(self, path, header):
         # header: frame, time_sec, queue_1, queue_2, ..., worker_count
-        # Check if worker_count column exists
-        has_workers = 'worker_count' in header
-        if has_workers:
-            q_count = len(header) - 3  # frame, time_sec, worker_count
-        else:
-            q_count = len(header) - 2  # frame, time_sec only
-        
-        for row in reader:
-            if not row:
-                continue
-            frame = int(row[0])
-            time_sec = float(row[1])
-            counts = [int(x) for x in row[2:2+q_count]]
-            times.append(time_sec)
-            queues.append(counts)
-            
-            if has_workers:
-                worker_counts.append(int(row[-1]))  # last column is worker_count
-
-    if not times:
-        print("No data in CSV")
-        return 1
+        columns = [c.strip() for c in header.split(',')]
+        has_workers = 'worker_count' in columns
+        q_count = len(columns) - (3 if has_workers else 2)
+        if self.q_count is None:
+            self.q_count = q_count
+            self.occupancy_sum = np.zeros(q_count, dtype=np.int64)
+            self.departures = np.zeros(q_count, dtype=np.int64)
+        elif q_count != self.q_count:
+            raise ValueError(f"{path}: expected {self.q_count} queue columns, found {q_count}")
+        return {'has_workers': has_workers, 'offset': 0, 'first_time': None,
+                'last_time': None, 'last_row': None, 'span': 0.0}
+
+    def read_new(self, path, final=True):
+        """Consume every complete line appended to a CSV since the last call
 
-    total_time = times[-1] - times[0] if len(times) > 1 else times[-1]
-    if total_time <= 0:
-        total_time = max(times[-1], 1.0)
+        With final=False (--follow) a last line without a newline may still be
+        being written, so it is left for the next call
+        """
+        with open(path, 'rb') as f:
+            state = self.files.get(path)
+            if state is None:
+                header = f.readline()
+                if not header.endswith(b'\n'):
+                    return 0
+                state = self.parse_header(path, header.decode('utf-8'))
+                state['offset'] = f.tell()
+                self.files[path] = state
 
-    # transpose queues to per-queue lists
-    per_queue = list(map(list, zip(*queues)))
+            f.seek(state['offset'])
+            rows = 0
+            while True:
+                lines = f.readlines(CHUNK_BYTES)
+                if not lines:
+                    break
+                # Leave a partially written last line for the next call
+                if not final and not lines[-1].endswith(b'\n'):
+                    partial = lines.pop()
+                    f.seek(-len(partial), io.SEEK_CUR)
+                    if not lines:
+                        break
+                try:
+                    rows += self.update(state, lines)
+                except ValueError:
+                    if final:
+                        raise
+                    # A row still being written (or malformed): fold in the
+                    # rows before it and retry from its start on the next poll
+                    bad = self.first_bad_line(lines)
+                    if bad:
+                        rows += self.update(state, lines[:bad])
+                    state['offset'] += sum(len(line) for line in lines[:bad])
+                    return rows
+                state['offset'] = f.tell()
+            return rows
 
-    results = []
-    for i, q in enumerate(per_queue):
-        # average number in queue (time-average approximated by frame average)
-        L = sum(q) / len(q)
+    @staticmethod
+    def first_bad_line(lines):
+        """Index of the first line that does not parse as a CSV row"""
+        for i, line in enumerate(lines):
+            try:
+                np.loadtxt(io.BytesIO(line), delimiter=',', ndmin=2)
+            except ValueError:
+                return i
+        return len(lines)
 
-        # estimate departures by summing positive drops between frames
-        departures = 0
-        for prev, curr in zip(q[:-1], q[1:]):
-            if curr < prev:
-                departures += (prev - curr)
+    def update(self, state, lines):
+        """Fold one chunk of CSV lines into the running totals"""
+        data = np.loadtxt(io.BytesIO(b''.join(lines)), delimiter=',', ndmin=2)
+        if data.size == 0:
+            return 0
 
-        throughput = departures / total_time if total_time > 0 else 0
+        times = data[:, 1]
+        counts = data[:, 2:2 + self.q_count].astype(np.int64)
 
-        if throughput > 0:
-            W = L / throughput
+        self.frames += len(counts)
+        self.occupancy_sum += counts.sum(axis=0)
+
+        # Departures: positive drops between consecutive frames, including the
+        # step from the previous chunk's last row
+        if state['last_row'] is not None:
+            counts_with_prev = np.vstack([state['last_row'], counts])
+        else:
+            counts_with_prev = counts
+        self.departures += np.clip(-np.diff(counts_with_prev, axis=0), 0, None).sum(axis=0)
+        state['last_row'] = counts[-1]
+
+        if state['first_time'] is None:
+            state['first_time'] = times[0]
+        state['last_time'] = times[-1]
+
+        # Per-file duration, summed across files
+        self.total_time -= state['span']
+        if state['last_time'] > state['first_time']:
+            state['span'] = state['last_time'] - state['first_time']
         else:
-            W = float('inf')
-
-        results.append({
-            'queue': i+1,
-            'avg_occupancy': L,
-            'departures': departures,
-            'throughput_per_sec': throughput,
-            'estimated_avg_wait_sec': W
-        })
-
-    # print a short summary
-    print(f"Analyzed: {csv_path}")
-    print(f"Total time (s): {total_time:.2f}, frames: {len(queues)}")
-    
-    if worker_counts:
-        avg_workers = sum(worker_counts) / len(worker_counts)
-        print(f"\nWorker Statistics:")
-        print(f"  Average workers detected: {avg_workers:.2f}")
-        print(f"  Min workers: {min(worker_counts)}, Max workers: {max(worker_counts)}")
-    
-    print(f"\nCustomer Queue Statistics:")
-    for r in results:
-        w = r['estimated_avg_wait_sec']
-        w_str = f"{w:.2f}s" if w != float('inf') else "inf"
-        print(f"Queue {r['queue']}: avg occupancy={r['avg_occupancy']:.2f}, departures={r['departures']}, throughput={r['throughput_per_sec']:.3f}/s, est avg wait={w_str}")
+            state['span'] = state['last_time']
+        self.total_time += state['span']
+
+        if state['has_workers']:
+            workers = data[:, -1].astype(np.int64)
+            self.worker_sum += int(workers.sum())
+            self.worker_frames += len(workers)
+            low, high = int(workers.min()), int(workers.max())
+            self.worker_min = low if self.worker_min is None else min(self.worker_min, low)
+            self.worker_max = high if self.worker_max is None else max(self.worker_max, high)
+
+        return len(counts)
+
+    def results(self):
+        total_time = self.total_time if self.total_time > 0 else 1.0
+        occupancy = self.occupancy_sum / self.frames
+        throughput = self.departures / total_time
+        with np.errstate(divide='ignore'):
+            wait = np.where(throughput > 0, occupancy / np.where(throughput > 0, throughput, 1), np.inf)
+
+        return [{
+            'queue': i + 1,
+            'avg_occupancy': float(occupancy[i]),
+            'departures': int(self.departures[i]),
+            'throughput_per_sec': float(throughput[i]),
+            'estimated_avg_wait_sec': float(wait[i])
+        } for i in range(self.q_count)]
+
+    def print_summary(self, paths):
+        # print a short summary
+        print(f"Analyzed: {', '.join(paths)}")
+        total_time = self.total_time if self.total_time > 0 else 1.0
+        print(f"Total time (s): {total_time:.2f}, frames: {self.frames}")
+
+        if self.worker_frames:
+            print(f"\nWorker Statistics:")
+            print(f"  Average workers detected: {self.worker_sum / self.worker_frames:.2f}")
+            print(f"  Min workers: {self.worker_min}, Max workers: {self.worker_max}")
+
+        print(f"\nCustomer Queue Statistics:")
+        for r in self.results():
+            w = r['estimated_avg_wait_sec']
+            w_str = f"{w:.2f}s" if w != float('inf') else "inf"
+            print(f"Queue {r['queue']}: avg occupancy={r['avg_occupancy']:.2f}, departures={r['departures']}, throughput={r['throughput_per_sec']:.3f}/s, est avg wait={w_str}")
+
+
+def analyze(csv_paths, follow=False, interval=5.0):
+    if isinstance(csv_paths, str):
+        csv_paths = [csv_paths]
+
+    for csv_path in csv_paths:
+        if not os.path.exists(csv_path):
+            print(f"CSV file not found: {csv_path}")
+            return 1
+
+    analyzer = QueueCountAnalyzer()
+    try:
+        for csv_path in csv_paths:
+            analyzer.read_new(csv_path, final=not follow)
+    except ValueError as e:
+        print(f"Invalid CSV: {e}")
+        return 1
+
+    if not analyzer.frames and not follow:
+        print("No data in CSV")
+        return 1
+
+    if analyzer.frames:
+        analyzer.print_summary(csv_paths)
+
+    # Keep folding in rows as the monitor appends them
+    while follow:
+        try:
+            time.sleep(interval)
+            new_rows = sum(analyzer.read_new(csv_path, final=False) for csv_path in csv_paths)
+        except KeyboardInterrupt:
+            break
+        except ValueError as e:
+            print(f"Invalid CSV, retrying: {e}")
+            continue
+        if new_rows:
+            print(f"\n--- {time.strftime('%H:%M:%S')}: +{new_rows} rows ---")
+            analyzer.print_summary(csv_paths)
 
     return 0
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python3 analyze_queue_counts.py /path/to/queue_counts.csv")
-        sys.exit(1)
-    csv_path = sys.argv[1]
-    sys.exit(analyze(csv_path))
+    parser = argparse.ArgumentParser(description='Queue occupancy, departures, throughput and Little\'s-law wait from queue count CSVs')
+    parser.add_argument('csv_paths', nargs='+', help='queue_counts.csv files (frame, time_sec, queue_1..N[, worker_count])')
+    parser.add_argument('--follow', action='store_true', help='keep watching the files and update results as they grow')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between --follow updates')
+    args = parser.parse_args()
+    sys.exit(analyze(args.csv_paths, args.follow, args.interval))
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Export the detector for CPU backends
+Exports a YOLO model to ONNX and/or OpenVINO next to the weights and,
+with --int8, quantizes it using frames from recorded footage for
+calibration. The files are named the way detector_backends looks them up
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from detector_backends import model_artifact, preprocess
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v')
+
+
+def calibration_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS)))
+        else:
+            files.extend(sorted(glob.glob(path)) or [path])
+    return files
+
+
+def load_calibration_frames(paths, count):
+    """Up to `count` frames spread evenly over the given images and videos"""
+    files = calibration_files(paths)
+    images = [f for f in files if f.lower().endswith(IMAGE_EXTENSIONS)]
+    videos = [f for f in files if f.lower().endswith(VIDEO_EXTENSIONS)]
+
+    frames = []
+    for path in images[:count]:
+        frame = cv2.imread(path)
+        if frame is not None:
+            frames.append(frame)
+
+    per_video = -(-(count - len(frames)) // len(videos)) if videos and len(frames) < count else 0
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for index in np.linspace(0, max(total - 1, 0), per_video).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ok, frame = cap.read()
+            if ok:
+                frames.append(frame)
+        cap.release()
+    return frames[:count]
+
+
+def export_fp32(model_path, backend, imgsz):
+    """Export through ultralytics; returns the path detector_backends will load"""
+    from ultralytics import YOLO
+
+    target = model_artifact(model_path, backend)
+    fmt = 'onnx' if backend == 'onnxruntime' else 'openvino'
+    print(f"📦 Exporting {model_path} to {fmt}...")
+    exported = YOLO(model_path).export(format=fmt, imgsz=imgsz, dynamic=True, simplify=True)
+    if backend == 'onnxruntime' and os.path.abspath(exported) != os.path.abspath(target):
+        shutil.move(exported, target)
+    return target
+
+
+def head_nodes(model):
+    """Nodes of the detection head (highest /model.N/ block), kept in float"""
+    blocks = [int(m.group(1)) for node in model.graph.node
+              for m in [re.match(r'/model\.(\d+)/', node.name)] if m]
+    if not blocks:
+        return []
+    prefix = f'/model.{max(blocks)}/'
+    return [node.name for node in model.graph.node if node.name.startswith(prefix)]
+
+
+def quantize_onnx(fp32_path, int8_path, frames, imgsz):
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            if frame is None:
+                return None
+            return {self.input_name: preprocess([frame], imgsz)[0]}
+
+    model = onnx.load(fp32_path)
+    input_name = model.graph.input[0].name
+    quantize_static(fp32_path, int8_path, FrameReader(input_name),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    nodes_to_exclude=head_nodes(model))
+    return int8_path
+
+
+def quantize_openvino(fp32_xml, int8_xml, frames, imgsz):
+    import nncf
+    import openvino as ov
+
+    model = ov.Core().read_model(fp32_xml)
+    dataset = nncf.Dataset(frames, lambda frame: preprocess([frame], imgsz)[0])
+    # Box decoding at the end of the head stays in float
+    ignored = nncf.IgnoredScope(types=['Multiply', 'Subtract', 'Sigmoid'])
+    quantized = nncf.quantize(model, dataset, preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=len(frames), ignored_scope=ignored)
+    os.makedirs(os.path.dirname(int8_xml), exist_ok=True)
+    ov.save_model(quantized, int8_xml)
+
+    # Lets the ultralytics wrapper load the INT8 folder as well
+    metadata = os.path.join(os.path.dirname(fp32_xml), 'metadata.yaml')
+    if os.path.exists(metadata):
+        shutil.copy(metadata, os.path.dirname(int8_xml))
+    return int8_xml
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export (and INT8-quantize) the detector for CPU backends')
+    parser.add_argument('--model', default='yolov8n.pt', help='YOLO weights to export')
+    parser.add_argument('--backend', nargs='+', choices=['onnxruntime', 'openvino'],
+                        default=['onnxruntime', 'openvino'], help='Backends to export for')
+    parser.add_argument('--imgsz', type=int, default=640, help='Inference size')
+    parser.add_argument('--int8', action='store_true', help='Also write INT8-quantized models')
+    parser.add_argument('--calibration', nargs='+', default=[],
+                        help='Recorded frames for INT8 calibration (images, videos or directories)')
+    parser.add_argument('--calibration-frames', type=int, default=300, help='Frames used for calibration')
+    args = parser.parse_args()
+
+    frames = []
+    if args.int8:
+        frames = load_calibration_frames(args.calibration, args.calibration_frames)
+        if not frames:
+            print("❌ INT8 needs calibration frames from recorded footage (--calibration)")
+            return 1
+        print(f"📹 {len(frames)} calibration frames")
+
+    for backend in args.backend:
+        fp32 = model_artifact(args.model, backend)
+        if not os.path.exists(fp32):
+            fp32 = export_fp32(args.model, backend, args.imgsz)
+        print(f"✅ {backend}: {fp32}")
+
+        if args.int8:
+            int8 = model_artifact(args.model, backend, int8=True)
+            print(f"📦 Quantizing {backend} model to INT8...")
+            if backend == 'onnxruntime':
+                quantize_onnx(fp32, int8, frames, args.imgsz)
+            else:
+                quantize_openvino(fp32, int8, frames, args.imgsz)
+            print(f"✅ {backend} INT8: {int8}")
+
+    print("Compare speed and accuracy with: python benchmarks/bench_detectors.py --frames <recordings>")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Export statistics from the columnar store to CSV
+Keeps the old live_statistics.csv workflow working for spreadsheets and
+the analyzer scripts
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stats_store import StatsStore
+
+DEFAULT_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'stats')
+
+
+def parse_time(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def export(store, camera_id, output_path, start=None, end=None):
+    """Stream every chunk of a camera into one CSV file"""
+    rows = 0
+    first = None
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['frame', 'time_sec', 'timestamp'] + list(store.fields))
+        for timestamps, columns in store.read(camera_id, start, end):
+            if first is None:
+                first = timestamps[0]
+            values = [columns[field].tolist() for field in store.fields]
+            for i, ts in enumerate(timestamps.tolist()):
+                writer.writerow([rows + i, f"{ts - first:.3f}",
+                                 time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts))]
+                                + [f"{column[i]:g}" for column in values])
+            rows += len(timestamps)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export stored queue statistics to CSV')
+    parser.add_argument('output', help='CSV file to write')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='Statistics store directory')
+    parser.add_argument('--camera', default='0', help='Camera id')
+    parser.add_argument('--from', dest='start', help='Start time (epoch seconds or ISO-8601)')
+    parser.add_argument('--to', dest='end', help='End time (epoch seconds or ISO-8601)')
+    args = parser.parse_args()
+
+    store = StatsStore(args.store)
+    if args.camera not in store.cameras():
+        print(f"❌ No statistics stored for camera {args.camera} in {args.store}")
+        return 1
+
+    rows = export(store, args.camera, args.output, parse_time(args.start), parse_time(args.end))
+    print(f"✅ Exported {rows} rows to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tiled inference coverage test
+Without ROI crops the tiles must cover the whole frame; with ROI crops only
+the regions around the zones
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from queue_analyzer import FrameAnalyzer
+from queue_monitor import QueueMonitor
+from zone_map import ZoneCrops
+
+WIDTH, HEIGHT = 1920, 1080
+
+# A single small zone in the top-left corner
+ZONES = [{'id': 1, 'name': 'Queue 1', 'polygon': [[100, 100], [400, 100], [400, 300], [100, 300]]}]
+
+
+def coverage(rects):
+    """Fraction of the frame's pixels inside at least one rect"""
+    covered = np.zeros((HEIGHT, WIDTH), dtype=bool)
+    for x1, y1, x2, y2 in rects:
+        covered[y1:y2, x1:x2] = True
+    return covered.mean()
+
+
+def check(name, passed):
+    print(f"   {'✅' if passed else '❌'} {name}")
+    return passed
+
+
+print("=" * 70)
+print("TILED INFERENCE COVERAGE")
+print("=" * 70)
+
+results = []
+
+full = ZoneCrops(ZONES, WIDTH, HEIGHT, tile_size=640, roi=False)
+print(f"\n1️⃣  Tiling without ROI crops: {len(full.rects)} tiles of {full.tile_size}px")
+results.append(check("tiled", full.tiled))
+results.append(check("tiles cover the whole frame", coverage(full.rects) == 1.0))
+results.append(check("at most max_tiles tiles", len(full.rects) <= 8))
+
+roi = ZoneCrops(ZONES, WIDTH, HEIGHT, tile_size=640, roi=True)
+print(f"\n2️⃣  Tiling with ROI crops: {len(roi.rects)} crop(s), {coverage(roi.rects):.0%} of the frame")
+results.append(check("only the zone region is detected", coverage(roi.rects) < 0.5))
+
+print("\n3️⃣  Crops built by the camera pipeline and the offline analyzer")
+monitor = QueueMonitor(None, tile_size=640)
+monitor.zones = ZONES
+results.append(check("QueueMonitor(roi_crops=False) covers the frame",
+                     coverage(monitor.compile_crops(WIDTH, HEIGHT).rects) == 1.0))
+monitor = QueueMonitor(None, roi_crops=True, tile_size=640)
+monitor.zones = ZONES
+results.append(check("QueueMonitor(roi_crops=True) keeps to the zones",
+                     coverage(monitor.compile_crops(WIDTH, HEIGHT).rects) < 0.5))
+analyzer = FrameAnalyzer(None, ZONES, roi_crops=False, tile_size=640)
+results.append(check("FrameAnalyzer(roi_crops=False) covers the frame",
+                     coverage(analyzer.compile(WIDTH, HEIGHT)[1].rects) == 1.0))
+
+print("\n" + "=" * 70)
+if all(results):
+    print("✅ PASS: tiling covers the whole frame unless ROI crops are enabled")
+else:
+    print("❌ FAIL: tiling coverage is wrong")
+print("=" * 70 + "\n")
+sys.exit(0 if all(results) else 1)
@@ -3,12 +3,20 @@ Smart Queue Monitoring System - Backend Server
 Flask API + WebSocket server for real-time queue monitoring
 """
 
+import atexit
 import os
-from flask import Flask, jsonify
+import time
+from datetime import datetime
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-import json
-import threading
+
+from config_store import zone_configs
+from outbound import Outbound
+
+# 'threading' (Flask-SocketIO, a thread per connection) or 'asgi' (asyncio
+# python-socketio server, started through asgi_server.py)
+SERVER_MODE = os.environ.get('SERVER_MODE', 'threading')
 
 app = Flask(__name__)
 CORS(app)
@@ -17,20 +25,147 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 # Get port from environment variable (Railway sets this)
 PORT = int(os.environ.get('PORT', 5000))
 
+# Detector micro-batching: flush after this many frames or this many milliseconds
+BATCH_SIZE = int(os.environ.get('DETECTOR_BATCH_SIZE', 8))
+BATCH_LATENCY_MS = float(os.environ.get('DETECTOR_MAX_LATENCY_MS', 40))
+
+# Detector backend ('ultralytics', 'onnxruntime' or 'openvino'), read from
+# config/detector.json; these environment variables override it
+DETECTOR_OVERRIDES = {
+    'backend': os.environ.get('DETECTOR_BACKEND') or None,
+    'model': os.environ.get('DETECTOR_MODEL') or None,
+    'int8': os.environ['DETECTOR_INT8'] != '0' if os.environ.get('DETECTOR_INT8') else None,
+    'imgsz': int(os.environ['DETECTOR_IMGSZ']) if os.environ.get('DETECTOR_IMGSZ') else None,
+    'threads': int(os.environ['DETECTOR_THREADS']) if os.environ.get('DETECTOR_THREADS') else None
+}
+
+# Load and warm up the detector in the background at startup, so the first
+# camera start does not wait for it (0 loads it on the first start instead)
+PRELOAD_DETECTOR = os.environ.get('PRELOAD_DETECTOR', '1') != '0'
+
+# Motion gate: skip the detector on static scenes, but re-run it at least this often
+MOTION_GATE = os.environ.get('MOTION_GATE', '1') != '0'
+MOTION_REFRESH_SECONDS = float(os.environ.get('MOTION_REFRESH_SECONDS', 2))
+
+# Run the detector only on crops around the zones (padded by ROI_PADDING of
+# the frame height, merged into at most ROI_MAX_CROPS regions)
+ROI_CROPS = os.environ.get('ROI_CROPS', '0') != '0'
+ROI_PADDING = float(os.environ.get('ROI_PADDING', 0.1))
+ROI_MAX_CROPS = int(os.environ.get('ROI_MAX_CROPS', 3))
+
+# Camera capture size; above 640x480 enable TILED_INFERENCE so distant people
+# are detected at native resolution in overlapping TILE_SIZE tiles (default:
+# the detector input size), at most MAX_TILES per frame
+CAPTURE_RESOLUTION = os.environ.get('CAPTURE_RESOLUTION', '640x480')
+TILED_INFERENCE = os.environ.get('TILED_INFERENCE', '0') != '0'
+TILE_SIZE = int(os.environ['TILE_SIZE']) if os.environ.get('TILE_SIZE') else None
+TILE_OVERLAP = float(os.environ.get('TILE_OVERLAP', 0.2))
+MAX_TILES = int(os.environ.get('MAX_TILES', 8))
+
+# Let start requests open any source they name (files, URLs); by default
+# only the sources in config/cameras.json are accepted
+ALLOW_SOURCE_OVERRIDE = os.environ.get('ALLOW_SOURCE_OVERRIDE', '0') != '0'
+
+# Per-client delivery: queue_update/video_frame are coalesced per client
+# (latest wins), sent at most CLIENT_MAX_FPS times a second per camera (0 =
+# no cap), with at most CLIENT_MAX_IN_FLIGHT waiting for the client's ack
+CLIENT_MAX_FPS = float(os.environ.get('CLIENT_MAX_FPS', 15))
+CLIENT_MAX_IN_FLIGHT = int(os.environ.get('CLIENT_MAX_IN_FLIGHT', 4))
+CLIENT_ACK_TIMEOUT = float(os.environ.get('CLIENT_ACK_TIMEOUT', 2))
+
+# Video transport: 'mjpeg' HTTP stream only (queue_update carries stats),
+# 'binary' JPEG video_frame events, 'base64' inside queue_update, or
+# 'geometry' (queue_update carries boxes and zone ids, the dashboard draws
+# the overlay over unannotated frames sent RAW_FRAME_FPS times a second)
+VIDEO_TRANSPORT = os.environ.get('VIDEO_TRANSPORT', 'mjpeg')
+RAW_FRAME_FPS = float(os.environ.get('RAW_FRAME_FPS', 2))
+
+# Seconds of per-camera statistics kept in memory (a day); frames are
+# aggregated into one min/max/mean row per second whatever the frame rate
+HISTORY_CAPACITY = int(os.environ.get('HISTORY_CAPACITY', 86400))
+
+# Durable statistics store (empty STATS_STORE_DIR disables it)
+STATS_STORE_DIR = os.environ.get('STATS_STORE_DIR', os.path.join(os.path.dirname(__file__), 'data', 'stats'))
+STATS_ROTATION = os.environ.get('STATS_ROTATION', 'hour')
+
 # Load configuration
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config', 'zones.json')
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), 'config')
+CONFIG_PATH = os.path.join(CONFIG_DIR, 'zones.json')
 
-# Import queue monitor
+# Import camera manager (one queue monitor per camera, shared detector);
+# the ML runtime itself is only imported when the detector loads
 try:
-    from queue_monitor import QueueMonitor
-    monitor = QueueMonitor(socketio, CONFIG_PATH)
-    MONITOR_AVAILABLE = True
-    print("✅ Queue monitor loaded")
+    from camera_manager import CameraManager, parse_resolution
+    from detector_backends import load_detector_config
+    from stats_store import StatsStore
+    from metrics import render_metrics
+    from streaming import MJPEG_BOUNDARY, mjpeg_stream
+    MONITOR_IMPORT_ERROR = None
 except Exception as e:
-    print(f"⚠️ Queue monitor not available: {e}")
-    print("   Install requirements: pip install ultralytics opencv-python")
-    MONITOR_AVAILABLE = False
-    monitor = None
+    MONITOR_IMPORT_ERROR = e
+
+MONITOR_AVAILABLE = False
+manager = None
+stats_store = None
+outbound = None
+
+def init_monitoring(emitter):
+    """Create the per-client outbound queues and the camera manager around a Socket.IO emitter"""
+    global MONITOR_AVAILABLE, manager, stats_store, outbound
+    outbound = Outbound(emitter, max_rate=CLIENT_MAX_FPS, max_in_flight=CLIENT_MAX_IN_FLIGHT,
+                        ack_timeout=CLIENT_ACK_TIMEOUT).start()
+    try:
+        if MONITOR_IMPORT_ERROR is not None:
+            raise MONITOR_IMPORT_ERROR
+        if STATS_STORE_DIR:
+            stats_store = StatsStore(STATS_STORE_DIR, rotation=STATS_ROTATION).start()
+            atexit.register(stats_store.close)
+        detector_config = load_detector_config(os.path.join(CONFIG_DIR, 'detector.json'), DETECTOR_OVERRIDES)
+        manager = CameraManager(emitter, CONFIG_DIR, CONFIG_PATH,
+                                max_batch_size=BATCH_SIZE, max_latency=BATCH_LATENCY_MS / 1000,
+                                motion_gate=MOTION_GATE, motion_refresh=MOTION_REFRESH_SECONDS,
+                                transport=VIDEO_TRANSPORT, history_capacity=HISTORY_CAPACITY,
+                                stats_store=stats_store, raw_frame_fps=RAW_FRAME_FPS,
+                                detector_config=detector_config, roi_crops=ROI_CROPS,
+                                roi_padding=ROI_PADDING, roi_max_crops=ROI_MAX_CROPS,
+                                capture_size=parse_resolution(CAPTURE_RESOLUTION), tiled=TILED_INFERENCE,
+                                tile_size=TILE_SIZE or detector_config['imgsz'], tile_overlap=TILE_OVERLAP,
+                                max_tiles=MAX_TILES, outbound=outbound,
+                                allow_source_override=ALLOW_SOURCE_OVERRIDE)
+        if PRELOAD_DETECTOR:
+            manager.detector.preload()
+        MONITOR_AVAILABLE = True
+        print("✅ Queue monitor loaded")
+    except Exception as e:
+        print(f"⚠️ Queue monitor not available: {e}")
+        print("   Install requirements: pip install ultralytics opencv-python")
+        MONITOR_AVAILABLE = False
+        manager = None
+
+# The asyncio server (asgi_server.py) initializes monitoring with its own emitter
+if SERVER_MODE == 'threading':
+    init_monitoring(socketio)
+
+def camera_from(data, default='0'):
+    """Read the camera id from a socket payload or query string"""
+    if isinstance(data, dict) and data.get('camera_id') is not None:
+        return str(data['camera_id'])
+    return default
+
+def parse_time(value, default=None):
+    """Parse epoch seconds or an ISO-8601 timestamp from a query string"""
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def zones_path(camera_id='0'):
+    """Zones file for a camera"""
+    if MONITOR_AVAILABLE:
+        return manager.zones_path(camera_id)
+    return CONFIG_PATH
 
 @app.route('/')
 def index():
@@ -46,59 +181,177 @@ def health():
     """Health check for monitoring"""
     return jsonify({'status': 'healthy'})
 
+@app.route('/api/ready')
+def ready():
+    """Readiness probe: 200 once the detector is loaded and warmed up, else 503"""
+    if not MONITOR_AVAILABLE:
+        return jsonify({'ready': False, 'state': 'unavailable'}), 503
+    detector = manager.detector
+    body = {'ready': detector.ready, 'state': detector.state, 'error': detector.load_error}
+    return jsonify(body), (200 if detector.ready else 503)
+
 @app.route('/api/status')
 def get_status():
     """Get system status"""
     try:
-        zones_configured = False
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, 'r') as f:
-                config = json.load(f)
-                zones_configured = len(config.get('zones', [])) > 0
+        camera_id = request.args.get('camera', '0')
+        if MONITOR_AVAILABLE and not manager.valid_camera_id(camera_id):
+            return jsonify({'error': f'Invalid camera id: {camera_id}'}), 400
+        
+        zones = zone_configs.get(zones_path(camera_id))
         
         return jsonify({
             'status': 'running',
-            'zones_configured': zones_configured,
-            'camera_active': False
+            'ready': MONITOR_AVAILABLE and manager.detector.ready,
+            'zones_configured': len(zones.zones) > 0,
+            'zones_version': zones.version,
+            'camera_active': MONITOR_AVAILABLE and manager.any_running,
+            'video_transport': VIDEO_TRANSPORT,
+            'raw_frame_fps': RAW_FRAME_FPS,
+            'cameras': manager.status() if MONITOR_AVAILABLE else [],
+            'detector': manager.detector.stats() if MONITOR_AVAILABLE else None,
+            'clients': outbound.stats() if outbound else None,
+            'stats_store': stats_store.stats() if MONITOR_AVAILABLE and stats_store else None
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/config')
 def get_config():
-    """Get zone configuration"""
+    """Get zone configuration (cached; answers If-None-Match with 304)"""
     try:
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, 'r') as f:
-                config = json.load(f)
-            return jsonify(config)
-        else:
-            return jsonify({'zones': []})
+        camera_id = request.args.get('camera', '0')
+        if MONITOR_AVAILABLE and not manager.valid_camera_id(camera_id):
+            return jsonify({'error': f'Invalid camera id: {camera_id}'}), 400
+        
+        zones = zone_configs.get(zones_path(camera_id))
+        response = jsonify(zones.config)
+        response.set_etag(zones.etag)
+        response.headers['X-Zones-Version'] = str(zones.version)
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@socketio.on('connect')
-def handle_connect():
+@app.route('/api/cameras')
+def list_cameras():
+    """List configured and running cameras"""
+    if not MONITOR_AVAILABLE:
+        return jsonify({'cameras': []})
+    return jsonify({'cameras': manager.status()})
+
+@app.route('/api/cameras/<camera_id>/start', methods=['POST'])
+def start_camera(camera_id):
+    """Start monitoring one camera"""
+    if not MONITOR_AVAILABLE:
+        return jsonify({'error': 'AI monitoring not available'}), 503
+    
+    body = request.get_json(silent=True) or {}
+    ok, message = manager.start(camera_id, body.get('source'), body.get('zones_file'))
+    return jsonify({'camera': camera_id, 'message': message}), (202 if ok else 409)
+
+@app.route('/api/cameras/<camera_id>/stop', methods=['POST'])
+def stop_camera(camera_id):
+    """Stop monitoring one camera"""
+    if not MONITOR_AVAILABLE:
+        return jsonify({'error': 'AI monitoring not available'}), 503
+    
+    ok, message = manager.stop(camera_id)
+    return jsonify({'camera': camera_id, 'message': message}), (202 if ok else 409)
+
+@app.route('/api/history')
+def get_history():
+    """Downsampled statistics history (?camera=&from=&to=&points=)"""
+    if not MONITOR_AVAILABLE:
+        return jsonify({'error': 'AI monitoring not available'}), 503
+    
+    camera_id = request.args.get('camera', '0')
+    if not manager.valid_camera_id(camera_id):
+        return jsonify({'error': f'Invalid camera id: {camera_id}'}), 400
+    
+    try:
+        end = parse_time(request.args.get('to'), time.time())
+        start = parse_time(request.args.get('from'), end - 3600)
+        points = min(max(request.args.get('points', 300, type=int), 1), 5000)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid time range: {e}'}), 400
+    
+    # Read-only requests never create monitors (each holds a history buffer)
+    monitor = manager.monitors.get(camera_id)
+    if monitor is None:
+        return jsonify({'error': f'No history for camera {camera_id}'}), 404
+    
+    history = monitor.history.query(start, end, points)
+    history['camera'] = camera_id
+    return jsonify(history)
+
+@app.route('/metrics')
+def get_metrics():
+    """Pipeline metrics in the Prometheus text format"""
+    if not MONITOR_AVAILABLE:
+        return Response('', mimetype='text/plain')
+    return Response(render_metrics(manager, stats_store),
+                    mimetype='text/plain; version=0.0.4')
+
+STREAM_HEADERS = {'Cache-Control': 'no-cache, no-store', 'X-Accel-Buffering': 'no'}
+
+def stream_slot(camera_id, tier='full'):
+    """Frame slot of a running camera's MJPEG tier as (slot, error, status)"""
+    if not MONITOR_AVAILABLE:
+        return None, 'AI monitoring not available', 503
+    if not manager.valid_camera_id(camera_id):
+        return None, f'Invalid camera id: {camera_id}', 400
+    
+    monitor = manager.monitors.get(camera_id)
+    if monitor is None or not monitor.running:
+        return None, f'Camera {camera_id} is not running', 404
+    
+    slot = monitor.encoder.slot(tier)
+    if slot is None:
+        return None, f'Unknown tier: {tier}', 400
+    return slot, None, 200
+
+@app.route('/api/stream/<camera_id>.mjpg')
+def stream_camera(camera_id):
+    """MJPEG stream of a camera's latest annotated frame (optional ?tier= and ?fps=)"""
+    slot, error, status = stream_slot(camera_id, request.args.get('tier', 'full'))
+    if slot is None:
+        return jsonify({'error': error}), status
+    
+    max_fps = request.args.get('fps', type=float)
+    return Response(mjpeg_stream(slot, max_fps),
+                    mimetype=f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}',
+                    headers=STREAM_HEADERS)
+
+# Socket.IO events. The handlers take the client's sid and a reply(event, data)
+# function answering that client, so the threading server below and the
+# asyncio server (asgi_server.py) share them
+
+def on_connect(sid, reply):
     """Handle WebSocket connection"""
     print('Client connected')
-    emit('connection_response', {'status': 'connected'})
+    if MONITOR_AVAILABLE:
+        manager.client_connected(sid)
+    else:
+        outbound.connect(sid)
+    reply('connection_response', {'status': 'connected'})
 
-@socketio.on('disconnect')
-def handle_disconnect():
+def on_disconnect(sid):
     """Handle WebSocket disconnection"""
     print('Client disconnected')
+    if MONITOR_AVAILABLE:
+        manager.client_disconnected(sid)
+    else:
+        outbound.disconnect(sid)
 
-@socketio.on('queue_update')
-def handle_queue_update(data):
+def on_queue_update(sid, data, reply):
     """Handle queue update from monitoring system"""
-    # Broadcast to all connected clients
-    emit('queue_data', data, broadcast=True)
+    # Relay to all connected clients through their outbound queues
+    outbound.emit('queue_data', data)
 
-@socketio.on('request_data')
-def handle_data_request():
+def on_request_data(sid, data, reply):
     """Handle data request from client"""
     # Send mock data for now
-    emit('queue_data', {
+    reply('queue_data', {
         'timestamp': '2024-01-30T18:00:00',
         'zones': [
             {'id': 1, 'name': 'Zone 1', 'count': 5, 'status': 'normal'},
@@ -106,66 +359,143 @@ def handle_data_request():
         ]
     })
 
-@socketio.on('start_camera')
-def handle_start_camera(data):
+def on_start_camera(sid, data, reply):
     """Handle camera start request"""
     print(f'Camera start requested: {data}')
     
     if not MONITOR_AVAILABLE:
-        emit('error', {'message': 'AI monitoring not available. Install: pip install ultralytics opencv-python'})
+        reply('error', {'message': 'AI monitoring not available. Install: pip install ultralytics opencv-python'})
         return
     
-    if monitor.running:
-        emit('error', {'message': 'Camera already running'})
-        return
+    data = data or {}
+    camera_id = camera_from(data)
     
     # Start monitoring in background thread
-    monitor_thread = threading.Thread(target=monitor.run)
-    monitor_thread.daemon = True
-    monitor_thread.start()
+    ok, message = manager.start(camera_id, data.get('source'), data.get('zones_file'))
+    if not ok:
+        reply('error', {'camera': camera_id, 'message': message})
 
-@socketio.on('stop_camera')
-def handle_stop_camera():
-    """Handle camera stop request"""
-    print('Camera stop requested')
+def on_stop_camera(sid, data, reply):
+    """Handle camera stop request (all cameras when no camera_id is given)"""
+    print(f'Camera stop requested: {data}')
     
     if not MONITOR_AVAILABLE:
         return
     
-    if monitor.running:
-        monitor.stop()
+    if isinstance(data, dict) and data.get('camera_id') is not None:
+        manager.stop(camera_from(data))
+    else:
+        manager.stop_all()
 
-@socketio.on('capture_frame')
-def handle_capture_frame():
+def on_capture_frame(sid, data, reply):
     """Handle frame capture for zone configuration"""
     print('Frame capture requested')
     
     if not MONITOR_AVAILABLE:
-        emit('error', {'message': 'Camera not available'})
+        reply('error', {'message': 'Camera not available'})
+        return
+    
+    camera_id = camera_from(data)
+    if not manager.valid_camera_id(camera_id):
+        reply('error', {'message': f'Invalid camera id: {camera_id}'})
+        return
+    if not manager.known_camera(camera_id):
+        reply('error', {'camera': camera_id, 'message': f'Unknown camera: {camera_id}'})
         return
     
     # Capture frame
-    frame_base64 = monitor.capture_frame_for_zones()
+    frame_base64 = manager.get_monitor(camera_id).capture_frame_for_zones()
     
     if frame_base64:
-        emit('frame_captured', {'frame': frame_base64})
+        reply('frame_captured', {'camera': camera_id, 'frame': frame_base64})
     else:
-        emit('error', {'message': 'Failed to capture frame'})
+        reply('error', {'camera': camera_id, 'message': 'Failed to capture frame'})
 
-@socketio.on('save_zones')
-def handle_save_zones(data):
+def on_watch_video(sid, data, reply):
+    """Subscribe (or with watch=false unsubscribe) to a camera's raw frames in geometry mode"""
+    if not MONITOR_AVAILABLE:
+        reply('error', {'message': 'Camera not available'})
+        return
+    
+    camera_id = camera_from(data)
+    if not manager.valid_camera_id(camera_id):
+        reply('error', {'message': f'Invalid camera id: {camera_id}'})
+        return
+    if not manager.known_camera(camera_id):
+        reply('error', {'camera': camera_id, 'message': f'Unknown camera: {camera_id}'})
+        return
+    
+    watch = not isinstance(data, dict) or data.get('watch', True) is not False
+    manager.watch_video(sid, camera_id, watch)
+
+def on_stream_options(sid, data, reply):
+    """Let a client lower its own update rate (max_fps per camera, capped by CLIENT_MAX_FPS)"""
+    if not isinstance(data, dict):
+        return
+    
+    try:
+        max_fps = float(data['max_fps']) if data.get('max_fps') else None
+    except (TypeError, ValueError):
+        reply('error', {'message': f"Invalid max_fps: {data.get('max_fps')}"})
+        return
+    outbound.configure(sid, max_fps)
+
+def on_save_zones(sid, data, reply):
     """Handle zone configuration save"""
     print(f'Zones save requested: {data}')
     try:
-        # Save zones to config file
-        with open(CONFIG_PATH, 'w') as f:
-            json.dump(data, f, indent=2)
-        emit('zones_saved', {'status': 'success', 'message': 'Zones saved successfully'})
+        camera_id = camera_from(data)
+        if MONITOR_AVAILABLE and not manager.valid_camera_id(camera_id):
+            reply('error', {'message': f'Invalid camera id: {camera_id}'})
+            return
+        
+        config = {key: value for key, value in data.items() if key != 'camera_id'}
+        
+        # Atomically save zones to the camera's config file; running monitors
+        # switch to them between frames
+        zones = zone_configs.save(zones_path(camera_id), config)
+        
+        reply('zones_saved', {'camera': camera_id, 'version': zones.version,
+                              'status': 'success', 'message': 'Zones saved successfully'})
     except Exception as e:
-        emit('error', {'message': f'Failed to save zones: {str(e)}'})
+        reply('error', {'message': f'Failed to save zones: {str(e)}'})
+
+SOCKET_EVENTS = {
+    'queue_update': on_queue_update,
+    'request_data': on_request_data,
+    'start_camera': on_start_camera,
+    'stop_camera': on_stop_camera,
+    'capture_frame': on_capture_frame,
+    'watch_video': on_watch_video,
+    'stream_options': on_stream_options,
+    'save_zones': on_save_zones
+}
+
+@socketio.on('connect')
+def handle_connect():
+    on_connect(request.sid, emit)
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    on_disconnect(request.sid)
+
+def flask_socket_handler(handler):
+    """Adapt a shared event handler to Flask-SocketIO (replies go to the sender)"""
+    def handle(data=None):
+        handler(request.sid, data, emit)
+    handle.__name__ = f'handle_{handler.__name__}'
+    return handle
+
+for event, handler in SOCKET_EVENTS.items():
+    socketio.on_event(event, flask_socket_handler(handler))
 
 if __name__ == '__main__':
-    print(f'🚀 Starting server on port {PORT}')
-    print(f'📡 WebSocket enabled')
-    print(f'🌐 CORS enabled for all origins')
-    socketio.run(app, host='0.0.0.0', port=PORT, debug=False)
+    if SERVER_MODE == 'asgi':
+        import uvicorn
+        print(f'🚀 Starting asyncio server on port {PORT}')
+        uvicorn.run('asgi_server:app', host='0.0.0.0', port=PORT, log_level='warning')
+    else:
+        print(f'🚀 Starting server on port {PORT}')
+        print(f'📡 WebSocket enabled')
+        print(f'🌐 CORS enabled for all origins')
+        socketio.run(app, host='0.0.0.0', port=PORT, debug=False)
@@ -0,0 +1,172 @@
+"""
+Persistent Statistics Store
+Append-only columnar store of per-frame statistics: a background writer
+buffers rows per camera and flushes them as compressed NumPy chunks,
+rotated into hourly (or daily) directories
+"""
+
+import glob
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from history import HISTORY_FIELDS
+
+ROTATIONS = {
+    'hour': ('%Y-%m-%d', '%H'),
+    'day': ('%Y-%m-%d', None)
+}
+
+
+class StatsStore:
+    """Background writer and reader for chunked, compressed statistics columns"""
+
+    def __init__(self, root, fields=HISTORY_FIELDS, rotation='hour', chunk_rows=5000,
+                 flush_interval=30.0, max_pending=100000):
+        if rotation not in ROTATIONS:
+            raise ValueError(f'Unknown rotation: {rotation}')
+        self.root = root
+        self.fields = tuple(fields)
+        self.rotation = rotation
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.buffers = {}
+        self.last_flush = time.monotonic()
+        self.writer = None
+        self.closing = threading.Event()
+        self.written = 0
+        self.chunks = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the background writer thread"""
+        if self.writer is None:
+            os.makedirs(self.root, exist_ok=True)
+            self.writer = threading.Thread(target=self._run, name='stats-store', daemon=True)
+            self.writer.start()
+        return self
+
+    def close(self):
+        """Flush everything still buffered and stop the writer"""
+        if self.writer is not None:
+            self.closing.set()
+            self.writer.join(timeout=10)
+            self.writer = None
+
+    def append(self, camera_id, timestamp, stats):
+        """Queue one frame's statistics; never blocks the frame loop"""
+        row = tuple(stats.get(field, 0) for field in self.fields)
+        try:
+            self.pending.put_nowait((str(camera_id), timestamp, row))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while not self.closing.is_set():
+            try:
+                camera_id, timestamp, row = self.pending.get(timeout=1.0)
+                self.buffer(camera_id, timestamp, row)
+            except queue.Empty:
+                pass
+
+            if time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush_all()
+
+        # Drain whatever arrived before close()
+        while True:
+            try:
+                self.buffer(*self.pending.get_nowait())
+            except queue.Empty:
+                break
+        self.flush_all()
+
+    def buffer(self, camera_id, timestamp, row):
+        rows = self.buffers.setdefault(camera_id, [])
+        # Never let a chunk span two rotation periods
+        if rows and self.period(rows[-1][0]) != self.period(timestamp):
+            self.flush(camera_id)
+            rows = self.buffers.setdefault(camera_id, [])
+        rows.append((timestamp, row))
+        if len(rows) >= self.chunk_rows:
+            self.flush(camera_id)
+
+    def flush_all(self):
+        for camera_id in list(self.buffers):
+            self.flush(camera_id)
+        self.last_flush = time.monotonic()
+
+    def period(self, timestamp):
+        """Directory parts (day[, hour]) holding rows of this timestamp"""
+        local = time.localtime(timestamp)
+        return tuple(time.strftime(fmt, local) for fmt in ROTATIONS[self.rotation] if fmt)
+
+    def flush(self, camera_id):
+        """Write a camera's buffered rows as one compressed chunk (atomically)"""
+        rows = self.buffers.pop(camera_id, None)
+        if not rows:
+            return
+
+        timestamps = np.fromiter((ts for ts, _ in rows), dtype=np.float64, count=len(rows))
+        values = np.asarray([row for _, row in rows], dtype=np.float32).reshape(len(rows), -1)
+        columns = {field: np.ascontiguousarray(values[:, i]) for i, field in enumerate(self.fields)}
+
+        directory = os.path.join(self.root, camera_id, *self.period(timestamps[0]))
+        os.makedirs(directory, exist_ok=True)
+        name = f'{int(timestamps[0] * 1000):015d}-{len(rows)}'
+        tmp_path = os.path.join(directory, f'.{name}.tmp.npz')
+        try:
+            np.savez_compressed(tmp_path, timestamp=timestamps, **columns)
+            os.replace(tmp_path, os.path.join(directory, f'{name}.npz'))
+            self.written += len(rows)
+            self.chunks += 1
+        except OSError as e:
+            print(f"❌ Failed to write statistics chunk: {e}")
+
+    def cameras(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def chunk_files(self, camera_id, start=None, end=None):
+        """Chunk files of a camera in time order, pruned by day directory"""
+        first_day = time.strftime('%Y-%m-%d', time.localtime(start)) if start is not None else None
+        last_day = time.strftime('%Y-%m-%d', time.localtime(end)) if end is not None else None
+
+        pattern = os.path.join(self.root, str(camera_id), '*', '**', '*.npz')
+        files = []
+        for path in glob.glob(pattern, recursive=True):
+            day = os.path.relpath(path, os.path.join(self.root, str(camera_id))).split(os.sep)[0]
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            files.append(path)
+        return sorted(files, key=os.path.basename)
+
+    def read(self, camera_id, start=None, end=None, fields=None):
+        """Yield (timestamps, {field: values}) chunks within [start, end]"""
+        fields = fields or self.fields
+        for path in self.chunk_files(camera_id, start, end):
+            with np.load(path) as chunk:
+                timestamps = chunk['timestamp']
+                mask = np.ones(len(timestamps), dtype=bool)
+                if start is not None:
+                    mask &= timestamps >= start
+                if end is not None:
+                    mask &= timestamps <= end
+                if not mask.any():
+                    continue
+                yield timestamps[mask], {field: chunk[field][mask] for field in fields if field in chunk}
+
+    def stats(self):
+        return {
+            'root': self.root,
+            'rotation': self.rotation,
+            'written': self.written,
+            'chunks': self.chunks,
+            'pending': self.pending.qsize(),
+            'dropped': self.dropped
+        }
@@ -0,0 +1,182 @@
+"""
+MJPEG Streaming
+Shared "latest encoded frame" slots, the tiered encoder that fills them,
+and the multipart/x-mixed-replace generator that lets every HTTP client
+pull video at its own pace
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+MJPEG_BOUNDARY = 'frame'
+
+# name -> (scale, JPEG quality)
+DEFAULT_TIERS = {
+    'full': (1.0, 80),
+    'half': (0.5, 75),
+    'thumb': (0.25, 60)
+}
+
+
+class FrameSlot:
+    """Latest encoded JPEG of one camera; readers skip frames they missed"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.jpeg = None
+        self.sequence = 0
+        self.subscribers = 0
+        self.closed = True
+        self.listeners = []  # callbacks run on every publish and close (async readers)
+
+    def open(self):
+        with self.condition:
+            self.closed = False
+            self.jpeg = None
+
+    def close(self):
+        """Wake every reader so their streams can end"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener()
+
+    def publish(self, jpeg):
+        """Replace the latest frame and wake waiting readers"""
+        with self.condition:
+            self.jpeg = jpeg
+            self.sequence += 1
+            self.condition.notify_all()
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener()
+
+    def subscribe(self):
+        with self.condition:
+            self.subscribers += 1
+
+    def unsubscribe(self):
+        with self.condition:
+            self.subscribers = max(0, self.subscribers - 1)
+
+    def listen(self, callback):
+        with self.condition:
+            self.listeners.append(callback)
+
+    def unlisten(self, callback):
+        with self.condition:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def latest(self):
+        """(sequence, jpeg, closed) without waiting"""
+        with self.condition:
+            return self.sequence, self.jpeg, self.closed
+
+    def wait_next(self, last_sequence, timeout=1.0):
+        """Block until a frame newer than last_sequence is available"""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.closed or (self.jpeg is not None and self.sequence != last_sequence),
+                timeout)
+            return self.sequence, self.jpeg, self.closed
+
+
+class FrameEncoder:
+    """Encodes each frame once per tier that currently has subscribers"""
+
+    def __init__(self, tiers=None, executor=None):
+        self.tiers = dict(tiers or DEFAULT_TIERS)
+        self.slots = {name: FrameSlot() for name in self.tiers}
+        self.executor = executor or ThreadPoolExecutor(max_workers=len(self.tiers),
+                                                       thread_name_prefix='encoder')
+        self.encoded = {name: 0 for name in self.tiers}
+        self.skipped = 0
+
+    def slot(self, tier):
+        return self.slots.get(tier)
+
+    def open(self):
+        for slot in self.slots.values():
+            slot.open()
+
+    def close(self):
+        for slot in self.slots.values():
+            slot.close()
+
+    def wanted(self, extra_tiers=()):
+        """Tiers watched by at least one stream, plus tiers needed by the caller"""
+        tiers = [name for name, slot in self.slots.items() if slot.subscribers]
+        tiers += [name for name in extra_tiers if name in self.tiers and name not in tiers]
+        return tiers
+
+    def encode_tier(self, frame, tier):
+        scale, quality = self.tiers[tier]
+        if scale != 1.0:
+            height, width = frame.shape[:2]
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes()
+
+    def encode(self, frame, extra_tiers=()):
+        """Encode the wanted tiers in parallel, publish them and return {tier: jpeg}"""
+        tiers = self.wanted(extra_tiers)
+        if not tiers:
+            self.skipped += 1
+            return {}
+
+        futures = {tier: self.executor.submit(self.encode_tier, frame, tier) for tier in tiers}
+        encoded = {}
+        for tier, future in futures.items():
+            encoded[tier] = future.result()
+            self.encoded[tier] += 1
+            self.slots[tier].publish(encoded[tier])
+        return encoded
+
+    def stats(self):
+        return {
+            'subscribers': {name: slot.subscribers for name, slot in self.slots.items()},
+            'encoded': dict(self.encoded),
+            'skipped': self.skipped
+        }
+
+
+def mjpeg_part(jpeg):
+    """One multipart/x-mixed-replace part holding a JPEG"""
+    return (b'--' + MJPEG_BOUNDARY.encode() + b'\r\n'
+            b'Content-Type: image/jpeg\r\n'
+            b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+
+
+def mjpeg_stream(slot, max_fps=None):
+    """Yield multipart JPEG parts from a slot until the camera stops"""
+    min_interval = 1.0 / max_fps if max_fps else 0.0
+    last_sequence = -1
+    last_sent = 0.0
+
+    slot.subscribe()
+    try:
+        while True:
+            sequence, jpeg, closed = slot.wait_next(last_sequence)
+            if closed:
+                return
+            if jpeg is None or sequence == last_sequence:
+                continue
+
+            last_sequence = sequence
+            yield mjpeg_part(jpeg)
+
+            # Per-client rate cap; frames published meanwhile are skipped
+            if min_interval:
+                delay = min_interval - (time.monotonic() - last_sent)
+                if delay > 0:
+                    time.sleep(delay)
+                last_sent = time.monotonic()
+    finally:
+        slot.unsubscribe()
@@ -0,0 +1,241 @@
+"""
+Compiled Zone Lookup
+Rasterizes zone polygons once into a per-pixel label map so detections can be
+assigned to zones with a single NumPy index instead of a ray cast per zone,
+pre-renders the zone outlines drawn on every video frame and works out the
+few frame regions the detector has to look at
+"""
+
+import cv2
+import numpy as np
+
+# Fixed-point bits used when rasterizing polygons with fractional vertices
+POLYGON_SHIFT = 4
+
+
+class ZoneMap:
+    """Label raster holding the zone id of every pixel (0 = Unknown)"""
+
+    UNKNOWN = 0
+
+    def __init__(self, zones, width, height):
+        self.source = zones
+        self.zones = list(zones)
+        self.width = int(width)
+        self.height = int(height)
+        self.names = ['Unknown'] + [zone['name'] for zone in self.zones]
+
+        dtype = np.uint8 if len(self.zones) < 255 else np.uint16
+        self.raster = np.zeros((self.height, self.width), dtype=dtype)
+
+        # Zones listed first win on overlap, so paint them last
+        scale = 1 << POLYGON_SHIFT
+        for zone_id in range(len(self.zones), 0, -1):
+            polygon = self.zones[zone_id - 1].get('polygon', [])
+            if len(polygon) < 3:
+                continue
+            points = np.round(np.asarray(polygon, dtype=np.float64) * scale).astype(np.int32)
+            cv2.fillPoly(self.raster, [points], int(zone_id), shift=POLYGON_SHIFT)
+
+    def matches(self, width, height):
+        """Check whether the raster was compiled for this frame size"""
+        return self.width == int(width) and self.height == int(height)
+
+    def lookup(self, centers):
+        """Return the zone id for each of N (x, y) centers"""
+        centers = np.asarray(centers)
+        if centers.size == 0:
+            return np.zeros(0, dtype=self.raster.dtype)
+
+        centers = centers.reshape(-1, 2)
+        xs = centers[:, 0].astype(np.intp)
+        ys = centers[:, 1].astype(np.intp)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+
+        zone_ids = np.zeros(len(centers), dtype=self.raster.dtype)
+        zone_ids[inside] = self.raster[ys[inside], xs[inside]]
+        return zone_ids
+
+    def zone_id(self, point):
+        """Return the zone id for a single (x, y) point"""
+        return int(self.lookup([point])[0])
+
+    def zone_name(self, zone_id):
+        """Translate a zone id back to its configured name"""
+        return self.names[zone_id]
+
+    def lookup_names(self, centers):
+        """Return the zone name for each of N (x, y) centers"""
+        return [self.names[zone_id] for zone_id in self.lookup(centers)]
+
+
+class ZoneOverlay:
+    """Zone outlines and labels rendered once, then stamped onto each frame"""
+
+    COLOR = (0, 255, 0)
+
+    def __init__(self, zones, width, height):
+        self.source = zones
+        self.width = int(width)
+        self.height = int(height)
+
+        canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        mask = np.zeros((self.height, self.width), dtype=np.uint8)
+        for zone in zones:
+            polygon = np.array(zone['polygon'], np.int32)
+            for image, color in ((canvas, self.COLOR), (mask, 255)):
+                cv2.polylines(image, [polygon], True, color, 2)
+                if len(polygon) > 0:
+                    cv2.putText(image, zone['name'], tuple(polygon[0]),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+        # Solid pixels are stamped with one masked copy; the anti-aliased
+        # fringe is blended using the mask as alpha. Both only touch drawn
+        # pixels, so compositing costs the same however many zones there are
+        self.canvas = canvas
+        self.mask = np.where(mask == 255, 255, 0).astype(np.uint8)
+        edge = np.flatnonzero((mask > 0) & (mask < 255))
+        alpha = np.repeat(mask.reshape(-1)[edge].astype(np.uint16), 3)
+        self.edge_index = (edge[:, None] * 3 + np.arange(3)).reshape(-1)
+        self.edge_alpha = 255 - alpha
+        self.edge_color = np.tile(np.array(self.COLOR, np.uint16), len(edge)) * alpha + 127
+
+    def matches(self, width, height):
+        """Check whether the overlay was rendered for this frame size"""
+        return self.width == int(width) and self.height == int(height)
+
+    def render(self, frame, out=None):
+        """Copy frame into out (a new array if None) with the zones drawn on top"""
+        if out is None:
+            out = frame.copy()
+        else:
+            np.copyto(out, frame)
+        cv2.copyTo(self.canvas, self.mask, out)
+        if len(self.edge_index):
+            flat = out.reshape(-1)
+            edge = flat[self.edge_index].astype(np.uint16)
+            flat[self.edge_index] = (edge * self.edge_alpha + self.edge_color) // 255
+        return out
+
+
+def tile_grid(rect, tile, overlap):
+    """Evenly spread tile x tile boxes covering rect, neighbours sharing at least overlap pixels"""
+    def starts(start, length):
+        if length <= tile:
+            return [start], length
+        count = -(-(length - overlap) // (tile - overlap))
+        return [start + round(i * (length - tile) / (count - 1)) for i in range(count)], tile
+
+    x1, y1, x2, y2 = rect
+    xs, tile_w = starts(x1, x2 - x1)
+    ys, tile_h = starts(y1, y2 - y1)
+    return [(x, y, x + tile_w, y + tile_h) for y in ys for x in xs]
+
+
+class ZoneCrops:
+    """Padded bounding boxes around the zones (or the whole frame when roi is
+    False), merged into a few detector crops and optionally sliced into
+    overlapping tiles"""
+
+    def __init__(self, zones, width, height, padding=0.1, max_crops=3, max_coverage=0.6,
+                 tile_size=None, tile_overlap=0.2, max_tiles=8, roi=True):
+        self.source = zones
+        self.width = int(width)
+        self.height = int(height)
+        # People standing in a zone stick out of its outline, so every box
+        # grows by a fraction of the frame height
+        pad = int(round(padding * self.height))
+
+        rects = []
+        for zone in (zones if roi else ()):
+            polygon = zone.get('polygon', [])
+            if len(polygon) < 3:
+                continue
+            points = np.asarray(polygon, dtype=np.float64)
+            x1, y1 = (np.floor(points.min(axis=0)).astype(int) - pad).tolist()
+            x2, y2 = (np.ceil(points.max(axis=0)).astype(int) + pad).tolist()
+            rect = (max(0, x1), max(0, y1), min(self.width, x2), min(self.height, y2))
+            if rect[2] > rect[0] and rect[3] > rect[1]:
+                rects.append(rect)
+        max_crops = max(1, int(max_crops))
+        max_tiles = max(1, int(max_tiles))
+        if tile_size:
+            # Every region takes at least one tile
+            max_crops = min(max_crops, max_tiles)
+        rects = self.merge(rects, max_crops)
+
+        self.area_fraction = sum(self.area(r) for r in rects) / float(self.width * self.height)
+        # Crops covering most of the frame are not worth the extra detector calls
+        self.full_frame = not rects or self.area_fraction > max_coverage
+        if self.full_frame:
+            rects = [(0, 0, self.width, self.height)]
+            self.area_fraction = 1.0
+        self.regions = rects
+
+        # Tiles at the detector's input size keep distant people at native
+        # resolution; past max_tiles they grow (and get downscaled) instead
+        self.tile_size = None
+        if tile_size:
+            tile = int(tile_size)
+            # A tile as large as the largest region gives one tile per region
+            largest = max(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in rects)
+            while True:
+                tiles = [t for rect in rects for t in tile_grid(rect, tile, int(tile * tile_overlap))]
+                if len(tiles) <= max_tiles or tile >= largest:
+                    break
+                tile = min(max(tile + 1, int(tile * 1.25)), largest)
+            if len(tiles) > len(rects):
+                rects = tiles
+                self.tile_size = tile
+        self.rects = rects
+
+    @property
+    def tiled(self):
+        return self.tile_size is not None
+
+    @staticmethod
+    def area(rect):
+        return (rect[2] - rect[0]) * (rect[3] - rect[1])
+
+    @staticmethod
+    def union(a, b):
+        return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+    @classmethod
+    def merge(cls, rects, max_crops):
+        """Merge overlapping boxes, then the cheapest pairs until at most max_crops remain"""
+        rects = list(rects)
+        while len(rects) > 1:
+            best = None
+            for i in range(len(rects)):
+                for j in range(i + 1, len(rects)):
+                    a, b = rects[i], rects[j]
+                    overlaps = a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+                    growth = cls.area(cls.union(a, b)) - cls.area(a) - cls.area(b)
+                    if overlaps:
+                        growth = float('-inf')
+                    if best is None or growth < best[0]:
+                        best = (growth, i, j)
+            growth, i, j = best
+            if growth != float('-inf') and len(rects) <= max_crops:
+                break
+            merged = cls.union(rects[i], rects[j])
+            rects = [r for k, r in enumerate(rects) if k not in (i, j)] + [merged]
+        return rects
+
+    def matches(self, width, height):
+        """Check whether the crops were computed for this frame size"""
+        return self.width == int(width) and self.height == int(height)
+
+    def crop(self, frame):
+        """Views of the frame for each crop (no copies)"""
+        return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in self.rects]
+
+    def describe(self):
+        return {
+            'crops': [list(rect) for rect in self.regions],
+            'tiles': [list(rect) for rect in self.rects] if self.tiled else None,
+            'tile_size': self.tile_size,
+            'area_fraction': round(self.area_fraction, 3),
+            'full_frame': self.full_frame
+        }
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { io, Socket } from 'socket.io-client';
 import ZoneDrawer from './ZoneDrawer';
 import './App.css';
@@ -21,19 +21,97 @@ interface Stats {
   alerts: number;
 }
 
+interface Geometry {
+  boxes: number[];  // x1, y1, x2, y2 per detection
+  zones: number[];  // index into zoneNames (0 = Unknown)
+  zoneNames: string[];
+  tracks: number[] | null;
+  size: [number, number];
+}
+
 interface QueueData {
+  camera: string;
   frame: number;
   timestamp: string;
   stats: Stats;
   customers: Customer[];
-  videoFrame: string;
+  videoFrame?: string;
+  detections?: Geometry;
+  zonesVersion?: number;
+}
+
+interface VideoFrame {
+  camera: string;
+  frame: number;
+  jpeg: ArrayBuffer;
+  raw?: boolean;
 }
 
+interface ZoneConfig {
+  name: string;
+  polygon: number[][];
+}
+
+type VideoTransport = 'mjpeg' | 'binary' | 'base64' | 'geometry';
+
+const wsUrl = process.env.REACT_APP_WS_URL || 'http://localhost:5001';
+const apiUrl = process.env.REACT_APP_API_URL || 'http://localhost:5001';
+
 interface Zone {
   name: string;
   polygon: Array<{ x: number; y: number }>;
 }
 
+// Same look as the server-side annotation: green zones, green boxes inside
+// a zone, red boxes outside, blue centers
+const drawOverlay = (
+  canvas: HTMLCanvasElement,
+  frame: ImageBitmap | null,
+  zones: ZoneConfig[],
+  geometry: Geometry
+) => {
+  const ctx = canvas.getContext('2d');
+  if (!ctx) return;
+  const [width, height] = geometry.size;
+  if (canvas.width !== width || canvas.height !== height) {
+    canvas.width = width;
+    canvas.height = height;
+  }
+
+  if (frame) {
+    ctx.drawImage(frame, 0, 0, width, height);
+  } else {
+    ctx.fillStyle = '#111827';
+    ctx.fillRect(0, 0, width, height);
+  }
+
+  ctx.lineWidth = 2;
+  ctx.strokeStyle = ctx.fillStyle = 'rgb(0, 255, 0)';
+  ctx.font = '16px sans-serif';
+  zones.forEach(zone => {
+    if (zone.polygon.length === 0) return;
+    ctx.beginPath();
+    zone.polygon.forEach(([x, y], i) => (i === 0 ? ctx.moveTo(x, y) : ctx.lineTo(x, y)));
+    ctx.closePath();
+    ctx.stroke();
+    ctx.fillText(zone.name, zone.polygon[0][0], zone.polygon[0][1]);
+  });
+
+  ctx.font = '14px sans-serif';
+  geometry.zones.forEach((zoneId, i) => {
+    const [x1, y1, x2, y2] = geometry.boxes.slice(i * 4, i * 4 + 4);
+    const color = zoneId !== 0 ? 'rgb(0, 255, 0)' : 'rgb(255, 0, 0)';
+    const track = geometry.tracks ? ` #${geometry.tracks[i]}` : '';
+    ctx.strokeStyle = ctx.fillStyle = color;
+    ctx.strokeRect(x1, y1, x2 - x1, y2 - y1);
+    ctx.fillText(`${geometry.zoneNames[zoneId]}${track}`, x1, y1 - 10);
+    ctx.fillStyle = 'rgb(0, 0, 255)';
+    ctx.beginPath();
+    ctx.arc((x1 + x2) / 2, (y1 + y2) / 2, 5, 0, 2 * Math.PI);
+    ctx.fill();
+  });
+};
+
 function App() {
   const [socket, setSocket] = useState<Socket | null>(null);
   const [connected, setConnected] = useState(false);
@@ -42,11 +120,91 @@ function App() {
   const [showZoneDrawer, setShowZoneDrawer] = useState(false);
   const [capturedFrame, setCapturedFrame] = useState<string | null>(null);
   const [zonesConfigured, setZonesConfigured] = useState(false);
+  const [binaryVideo, setBinaryVideo] = useState(false);
+  const [videoTransport, setVideoTransport] = useState<VideoTransport>('base64');
+  const videoCanvasRef = useRef<HTMLCanvasElement>(null);
 
   useEffect(() => {
-    const wsUrl = process.env.REACT_APP_WS_URL || 'http://localhost:5001';
-    const apiUrl = process.env.REACT_APP_API_URL || 'http://localhost:5001';
-    
+    // Geometry transport: latest raw frame, zones and detections, redrawn
+    // at most once per animation frame
+    let rawFrame: ImageBitmap | null = null;
+    let zones: ZoneConfig[] = [];
+    let zonesVersion: number | null = null;
+    let geometry: Geometry | null = null;
+    let overlayScheduled = false;
+
+    const scheduleOverlay = () => {
+      if (overlayScheduled) return;
+      overlayScheduled = true;
+      requestAnimationFrame(() => {
+        overlayScheduled = false;
+        const canvas = videoCanvasRef.current;
+        if (canvas && geometry) {
+          drawOverlay(canvas, rawFrame, zones, geometry);
+        }
+      });
+    };
+
+    const loadZones = (camera: string, version: number) => {
+      zonesVersion = version;
+      fetch(`${apiUrl}/api/config?camera=${encodeURIComponent(camera)}`)
+        .then(res => {
+          if (!res.ok) throw new Error('Failed to fetch zones');
+          return res.json();
+        })
+        .then(config => {
+          zones = config.zones || [];
+          scheduleOverlay();
+        })
+        .catch(err => {
+          console.error('Failed to load zones:', err);
+          zonesVersion = null;
+        });
+    };
+
+    // Decode binary JPEG frames off the main thread; while one decode is in
+    // flight only the newest pending frame is kept
+    let decoding = false;
+    let pendingFrame: VideoFrame | null = null;
+
+    const renderFrame = (frameData: VideoFrame) => {
+      if (decoding) {
+        pendingFrame = frameData;
+        return;
+      }
+      decoding = true;
+      createImageBitmap(new Blob([frameData.jpeg], { type: 'image/jpeg' }))
+        .then(bitmap => {
+          if (frameData.raw) {
+            // Unannotated frame: keep it as the background of the overlay
+            rawFrame?.close();
+            rawFrame = bitmap;
+            scheduleOverlay();
+            return;
+          }
+          const canvas = videoCanvasRef.current;
+          const ctx = canvas?.getContext('2d');
+          if (canvas && ctx) {
+            if (canvas.width !== bitmap.width || canvas.height !== bitmap.height) {
+              canvas.width = bitmap.width;
+              canvas.height = bitmap.height;
+            }
+            ctx.drawImage(bitmap, 0, 0);
+          }
+          bitmap.close();
+        })
+        .catch(err => console.error('Failed to decode frame:', err))
+        .finally(() => {
+          decoding = false;
+          if (pendingFrame) {
+            const next = pendingFrame;
+            pendingFrame = null;
+            renderFrame(next);
+          }
+        });
+    };
+
+
     console.log('Connecting to:', wsUrl);
     const newSocket = io(wsUrl, {
       reconnection: true,
@@ -67,6 +225,13 @@ function App() {
         })
         .then(data => {
           setZonesConfigured(data.zones_configured);
+          if (data.video_transport) {
+            setVideoTransport(data.video_transport);
+          }
+          if (data.video_transport === 'geometry') {
+            // Ask for the low-rate unannotated frames behind the overlay
+            newSocket.emit('watch_video', { camera_id: '0' });
+          }
         })
         .catch(err => {
           console.error('Failed to check status:', err);
@@ -79,8 +244,26 @@ function App() {
       setConnected(false);
     });
 
-    newSocket.on('queue_update', (updateData: QueueData) => {
+    // The server sends the next update once this one is acknowledged, so a
+    // slow client gets fewer, fresher updates instead of a growing backlog
+    newSocket.on('queue_update', (updateData: QueueData, ack?: () => void) => {
       setData(updateData);
+      if (updateData.detections) {
+        geometry = updateData.detections;
+        if (updateData.zonesVersion !== undefined && updateData.zonesVersion !== zonesVersion) {
+          loadZones(updateData.camera || '0', updateData.zonesVersion);
+        }
+        scheduleOverlay();
+      }
+      ack?.();
+    });
+
+    newSocket.on('video_frame', (frameData: VideoFrame, ack?: () => void) => {
+      if (!frameData.raw) {
+        setBinaryVideo(true);
+      }
+      renderFrame(frameData);
+      ack?.();
     });
 
     newSocket.on('camera_started', () => {
@@ -114,6 +297,7 @@ function App() {
 
     return () => {
       newSocket.close();
+      rawFrame?.close();
     };
   }, []);
 
@@ -225,7 +409,20 @@ function App() {
           <div className="content-grid">
             <div className="video-section">
               <h2>📹 Live Feed</h2>
-              {data.videoFrame && (
+              {videoTransport === 'mjpeg' ? (
+                cameraActive && (
+                  <img
+                    src={`${apiUrl}/api/stream/${data.camera || '0'}.mjpg`}
+                    alt="Live camera feed"
+                    className="video-frame"
+                  />
+                )
+              ) : binaryVideo || videoTransport === 'geometry' ? (
+                <canvas
+                  ref={videoCanvasRef}
+                  className="video-frame"
+                />
+              ) : data.videoFrame && (
                 <img 
                   src={`data:image/jpeg;base64,${data.videoFrame}`} 
                   alt="Live camera feed"